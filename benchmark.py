@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+2D Challenge 50.004: Introduction to Algorithms Sept-Dec 2019 term
+
+2-SAT Solver in Polynomial Time
+
+Benchmarks: Synthetic Instances, Size Sweeps and Regression Checks
+
+Usage:
+    python benchmark.py run --sizes 1000 10000 100000 --out bench.json
+    python benchmark.py compare bench.json baseline.json
+"""
+
+import argparse, contextlib, csv, io, json, os, random, statistics, \
+    tempfile, time
+
+import solve_2sat, solve_random
+
+
+KINDS = ("random", "chain", "hub", "planted-sat", "planted-unsat")
+
+ENGINES = {
+    "scc": lambda f: solve_2sat.My2SATSolver.solve(f),
+    "scc-csr": lambda f: solve_2sat.My2SATSolver.solve(f, csr=True),
+    "walk": lambda f: solve_random.My2SATSolver.solve(f),
+}
+
+
+def generate(kind, num_vars, num_clauses=None, seed=0):
+    """
+    Lazily generate the clauses of a synthetic 2-CNF instance.
+    
+    random:        uniformly random clauses
+    chain:         the implication chain x1 => x2 => ... => xn, plus
+                   random clauses, for deep DFS stacks
+    hub:           random clauses where one literal in two is drawn from
+                   a few hub variables, for high degree nodes
+    planted-sat:   random clauses satisfied by a hidden assignment
+    planted-unsat: planted-sat, plus two long implication chains
+                   x => ... => -x and -x => ... => x
+    
+    Input:  str (one of KINDS), int, int (defaults to num_vars), int
+    Output: generator of 2-tuples (a,b)
+    """
+    rng = random.Random(seed)
+    if num_clauses is None:
+        num_clauses = num_vars
+    
+    def literal():
+        return rng.choice((-1, 1)) * rng.randint(1, num_vars)
+    
+    if kind == "random":
+        for _ in range(num_clauses):
+            yield literal(), literal()
+    
+    elif kind == "chain":
+        for v in range(1, num_vars):
+            yield -v, v+1
+        for _ in range(num_clauses-num_vars+1):
+            yield literal(), literal()
+    
+    elif kind == "hub":
+        hubs = max(1, int(num_vars ** 0.5) // 10)
+        for _ in range(num_clauses):
+            if rng.random() < 0.5:
+                yield rng.choice((-1, 1)) * rng.randint(1, hubs), literal()
+            else:
+                yield literal(), literal()
+    
+    elif kind in ("planted-sat", "planted-unsat"):
+        hidden = [None] + [rng.random() < 0.5 for _ in range(num_vars)]
+        num_random = num_clauses
+        if kind == "planted-unsat":
+            length = min(num_vars-1, 100)
+            num_random -= 2*(length+1)
+        
+        for _ in range(max(num_random, 0)):
+            while True:  # reject clauses the hidden assignment falsifies
+                a, b = literal(), literal()
+                if (a > 0) == hidden[abs(a)] or (b > 0) == hidden[abs(b)]:
+                    yield a, b
+                    break
+        
+        if kind == "planted-unsat":  # x => v... => -x and -x => w... => x
+            x = rng.randint(1, num_vars)
+            for sign in (1, -1):
+                path = [v for v in rng.sample(range(1, num_vars+1),
+                                              length+1) if v != x][:length]
+                path = [sign*x] + [rng.choice((-1, 1))*v for v in path]
+                path.append(-sign*x)
+                for a, b in zip(path, path[1:]):
+                    yield -a, b  # a => b
+    
+    else:
+        raise ValueError("unknown instance kind " + repr(kind))
+
+
+def write_cnf(path, kind, num_vars, num_clauses=None, seed=0):
+    """
+    Stream a generated instance to a DIMACS .cnf file. The problem line
+    is padded, then filled in once the clauses are counted.
+    """
+    with open(path, "w") as f:
+        f.write("c " + kind + " seed " + str(seed) + "\n")
+        header = f.tell()
+        f.write(" " * 48 + "\n")
+        count = 0
+        for a, b in generate(kind, num_vars, num_clauses, seed):
+            f.write(str(a) + " " + str(b) + " 0\n")
+            count += 1
+        f.seek(header)
+        f.write("p cnf " + str(num_vars) + " " + str(count))
+    return path
+
+
+def time_engine(engine, cnf_path):
+    """Time one solve of a .cnf file, parsing included, without output."""
+    with open(cnf_path, "r") as f, contextlib.redirect_stdout(io.StringIO()):
+        start_time = time.perf_counter()
+        test_case = ENGINES[engine](f)
+        seconds = time.perf_counter()-start_time
+    return seconds, test_case
+
+
+def run(sizes, kinds=KINDS, engines=("scc", "scc-csr", "walk"), repeats=3,
+        warmup=1, seed=0, ratio=1.0, walk_max_vars=10**4, workdir=None):
+    """
+    Time each engine on each kind of instance, over a sweep of sizes.
+    
+    Every (kind, size) instance is generated once into workdir (a
+    temporary directory by default). Each engine is run warmup times
+    untimed, then repeats times timed. Random walks are skipped above
+    walk_max_vars variables, since their budget grows with n^2, and on
+    unsatisfiable instances, where they can only run out of steps or
+    time.
+    
+    Output: list of dicts, one per timed run
+    """
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in kinds:
+            for num_vars in sizes:
+                num_clauses = int(ratio*num_vars)
+                path = os.path.join(workdir or tmp, "2sat-" + kind + "-" +
+                                    str(num_vars) + ".cnf")
+                write_cnf(path, kind, num_vars, num_clauses, seed)
+                is_sat = None
+                
+                for engine in engines:
+                    if engine == "walk":
+                        if num_vars > walk_max_vars:
+                            continue
+                        if is_sat is None:
+                            is_sat = time_engine("scc-csr", path)[1].is_sat
+                        if is_sat != "SAT":
+                            continue
+                    for _ in range(warmup):
+                        time_engine(engine, path)
+                    for repeat in range(repeats):
+                        seconds, test_case = time_engine(engine, path)
+                        records.append({
+                            "kind": kind,
+                            "num_vars": num_vars,
+                            "num_clauses": num_clauses,
+                            "engine": engine,
+                            "repeat": repeat,
+                            "seconds": seconds,
+                            "is_sat": test_case.is_sat,
+                            "num_steps": getattr(test_case, "num_steps",
+                                                 None),
+                        })
+    return records
+
+
+def summarize(records):
+    """Median and best time per (kind, num_vars, engine)."""
+    groups = {}
+    for record in records:
+        key = (record["kind"], record["num_vars"], record["engine"])
+        groups.setdefault(key, []).append(record)
+    
+    summary = []
+    for (kind, num_vars, engine), group in groups.items():
+        seconds = [record["seconds"] for record in group]
+        summary.append({
+            "kind": kind,
+            "num_vars": num_vars,
+            "engine": engine,
+            "median": statistics.median(seconds),
+            "best": min(seconds),
+            "is_sat": group[0]["is_sat"],
+        })
+    return summary
+
+
+def write_json(records, path):
+    with open(path, "w") as f:
+        json.dump({"records": records, "summary": summarize(records)}, f,
+                  indent=1)
+
+
+# fields of a record of run, in csv column order
+FIELDS = ["kind", "num_vars", "num_clauses", "engine", "repeat", "seconds",
+          "is_sat", "num_steps"]
+
+
+def write_csv(records, path):
+    with open(path, "w", newline="") as f:  # just a header if no records
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)["records"]
+
+
+def read_csv(path):
+    with open(path, "r", newline="") as f:
+        records = list(csv.DictReader(f))
+    for record in records:  # csv only keeps strings
+        for field in ("num_vars", "num_clauses", "repeat"):
+            record[field] = int(record[field])
+        record["seconds"] = float(record["seconds"])
+        record["num_steps"] = int(record["num_steps"]) \
+            if record["num_steps"] else None
+    return records
+
+
+def read_records(path):
+    """Records of a run, from either output format of write_json, write_csv."""
+    return read_csv(path) if path.endswith(".csv") else read_json(path)
+
+
+def compare(records, baseline, threshold=0.1):
+    """
+    Compare median times against a baseline run.
+    
+    Output: list of dicts for every (kind, num_vars, engine) in both runs,
+            with the ratio of medians, and regression set if the new
+            median is more than threshold slower, or the answer changed
+    """
+    old = {(s["kind"], s["num_vars"], s["engine"]): s
+           for s in summarize(baseline)}
+    rows = []
+    for new in summarize(records):
+        key = (new["kind"], new["num_vars"], new["engine"])
+        if key not in old:
+            continue
+        ratio = new["median"] / max(old[key]["median"], 1e-9)
+        rows.append({
+            "kind": new["kind"],
+            "num_vars": new["num_vars"],
+            "engine": new["engine"],
+            "baseline": old[key]["median"],
+            "median": new["median"],
+            "ratio": ratio,
+            "regression": (ratio > 1+threshold or
+                           new["is_sat"] != old[key]["is_sat"]),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[2])
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = commands.add_parser("run", help="time a size sweep")
+    run_parser.add_argument("--sizes", type=int, nargs="+",
+                            default=[10**3, 10**4, 10**5])
+    run_parser.add_argument("--kinds", nargs="+", choices=KINDS,
+                            default=list(KINDS))
+    run_parser.add_argument("--engines", nargs="+", choices=list(ENGINES),
+                            default=list(ENGINES))
+    run_parser.add_argument("--repeats", type=int, default=3)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--ratio", type=float, default=1.0,
+                            help="clauses per variable")
+    run_parser.add_argument("--out", default="bench.json",
+                            help=".json or .csv output path")
+    run_parser.add_argument("--baseline",
+                            help="compare with this .json or .csv afterwards")
+    run_parser.add_argument("--workdir",
+                            help="keep the generated .cnf files here")
+    
+    compare_parser = commands.add_parser("compare",
+                                         help="flag regressions")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    
+    args = parser.parse_args()
+    threshold = getattr(args, "threshold", 0.1)
+    if args.command == "run":
+        records = run(args.sizes, args.kinds, args.engines, args.repeats,
+                      args.warmup, args.seed, args.ratio,
+                      workdir=args.workdir)
+        if args.out.endswith(".csv"):
+            write_csv(records, args.out)
+        else:
+            write_json(records, args.out)
+        for row in summarize(records):
+            print(row["kind"], row["num_vars"], row["engine"], row["is_sat"],
+                  solve_2sat.format_time(row["median"]), sep=",")
+        if not args.baseline:
+            return 0
+        baseline = read_records(args.baseline)
+    else:
+        records = read_records(args.current)
+        baseline = read_records(args.baseline)
+    
+    rows = compare(records, baseline, threshold)
+    for row in rows:
+        print(row["kind"], row["num_vars"], row["engine"],
+              "%.2fx" % row["ratio"],
+              "REGRESSION" if row["regression"] else "ok", sep=",")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
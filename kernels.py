@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+2D Challenge 50.004: Introduction to Algorithms Sept-Dec 2019 term
+
+2-SAT Solver in Polynomial Time
+
+Kernels: Inner Loops over Integer Arrays, Compiled with Numba if Installed
+
+JIT is True when Numba could be imported, and the solvers then call these
+kernels instead of their interpreted loops. Compiled machine code is
+cached on disk (next to this file, or in NUMBA_CACHE_DIR), so only the
+first process ever pays for compiling, and later ones just load it.
+Without Numba, the kernels are left as plain Python functions, which
+work (over NumPy arrays) but are slower than the solvers' own loops.
+"""
+
+try:  # optional, the solvers fall back to pure Python without it
+    import numba
+except ImportError:
+    numba = None
+
+try:  # Numba depends on it
+    import numpy as np
+except ImportError:
+    np = None
+
+JIT = numba is not None
+
+if JIT:
+    jit = numba.njit(cache=True, nogil=True)
+else:
+    def jit(f):
+        return f
+
+
+@jit
+def tarjan_scc_kernel(offsets, targets, num_nodes):
+    """
+    Iterative Tarjan's algorithm, as in My2SATSolver.tarjan_scc_csr.
+    
+    Input:  int64 array of offsets, int32 array of targets (CSR), int
+    Output: int32 array of nodes, one SCC after the other, in reverse
+            topological order (the root of each SCC is last)
+            int32 array of where each SCC ends in the nodes
+            int, max DFS stack depth
+    """
+    index = np.full(num_nodes, -1, np.int32)
+    order = np.empty(num_nodes, np.int32)
+    ends = np.empty(num_nodes, np.int32)
+    num_order, num_sccs, max_depth = tarjan_kernel(
+        offsets, targets, index, np.zeros(num_nodes, np.int32), 
+        np.zeros(num_nodes, np.uint8), offsets[:num_nodes].copy(), 
+        np.empty(num_nodes, np.int32), np.empty(num_nodes, np.int32), 
+        order, ends)
+    return order[:num_order], ends[:num_sccs], max_depth
+
+
+@jit
+def tarjan_kernel(offsets, targets, index, lowlinks, on_stack, next_edge, 
+                  stack, work, order, ends):
+    """
+    tarjan_scc_kernel over arrays given by the caller, which may be memory
+    mapped (or memoryviews, when not compiled). Once a node is assigned to
+    an SCC its index is replaced by the number of that SCC, so index ends
+    up numbering the SCCs of all nodes visited, in reverse topological 
+    order.
+    
+    Input:  int64 array of offsets, int32 array of targets (CSR)
+            int32 index, all -1 (unvisited)
+            int32 lowlinks, uint8 on_stack (all 0), int64 next_edge (a copy
+            of offsets), int32 stack and work, one per node
+            int32 order and ends, one per node, filled in as the SCCs are
+            (see tarjan_scc_kernel)
+    Output: int, int, int: length of order, of ends, max DFS stack depth
+    """
+    num_nodes = len(index)
+    top = num_order = num_sccs = index_ctr = max_depth = 0
+    
+    for root in range(num_nodes):
+        if index[root] >= 0 or offsets[root] == offsets[root+1]:
+            continue
+        
+        index[root] = lowlinks[root] = index_ctr
+        index_ctr += 1
+        stack[top] = root
+        top += 1
+        on_stack[root] = 1
+        work[0] = root
+        depth = 1
+        
+        while depth:
+            node = work[depth-1]
+            edge, end = next_edge[node], offsets[node+1]
+            descended = False
+            
+            while edge < end:
+                successor = targets[edge]
+                edge += 1
+                
+                if index[successor] < 0:  # tree edge
+                    index[successor] = lowlinks[successor] = index_ctr
+                    index_ctr += 1
+                    stack[top] = successor
+                    top += 1
+                    on_stack[successor] = 1
+                    work[depth] = successor
+                    depth += 1
+                    max_depth = max(max_depth, depth)
+                    descended = True
+                    break
+                
+                elif on_stack[successor]:  # back edge
+                    lowlinks[node] = min(lowlinks[node], index[successor])
+            
+            if descended:
+                next_edge[node] = edge  # resume here when we return
+                continue
+            
+            depth -= 1  # all successors explored, return to parent
+            if lowlinks[node] == index[node]:  # root of an SCC
+                while True:
+                    top -= 1
+                    successor = stack[top]
+                    on_stack[successor] = 0
+                    index[successor] = num_sccs  # only compared with -1 now
+                    order[num_order] = successor
+                    num_order += 1
+                    if successor == node: break
+                ends[num_sccs] = num_order
+                num_sccs += 1
+            
+            if depth:
+                k = work[depth-1]
+                lowlinks[k] = min(lowlinks[k], lowlinks[node])
+    
+    return num_order, num_sccs, max_depth
+
+
+@jit
+def seed_kernel(seed):
+    """Seed the random numbers of walk_kernel (Numba keeps its own)."""
+    np.random.seed(seed)
+
+
+@jit
+def breaks_kernel(v, value, num_true, occ_offsets, occ_clauses,
+                  occ_literals):
+    """Number of satisfied clauses which only v satisfies."""
+    num_breaks = 0
+    for i in range(occ_offsets[v], occ_offsets[v+1]):
+        if num_true[occ_clauses[i]] == 1 and \
+                (occ_literals[i] > 0) == value[v]:
+            num_breaks += 1
+    return num_breaks
+
+
+@jit
+def walk_kernel(literals, occ_offsets, occ_clauses, occ_literals, value,
+                num_true, unsat, position, num_unsat, max_steps, walksat,
+                noise):
+    """
+    At most max_steps steps of My2SATSolver.random_walk (in solve_random),
+    stopping early at a model. The state arrays are updated in place, so
+    a walk can be run a chunk of steps at a time.
+    
+    Input:  int32 array of 2 literals per clause (the second 0 for units),
+            never of the same variable (see solve_random.normalize_clauses)
+            int64 offsets, int32 clauses and int32 literals of the
+            occurrences of each variable (CSR)
+            state: uint8 value per variable, int8 true literals and int64
+            position in unsat (or -1) per clause, int32 unsat clauses, and
+            int64 array holding their number
+            int, bool, float (see random_walk)
+    Output: int, number of steps taken
+    """
+    n = num_unsat[0]
+    num_steps = 0
+    while n and num_steps < max_steps:
+        num_steps += 1
+        c = unsat[np.random.randint(0, n)]  # find a bad clause
+        a, b = abs(literals[2*c]), abs(literals[2*c+1])
+        
+        if walksat and b:  # choose the literal that breaks the least
+            breaks_a = breaks_kernel(a, value, num_true, occ_offsets,
+                                     occ_clauses, occ_literals)
+            breaks_b = breaks_kernel(b, value, num_true, occ_offsets,
+                                     occ_clauses, occ_literals)
+            if min(breaks_a, breaks_b) > 0 and np.random.random() < noise:
+                v = a if np.random.random() < 0.5 else b
+            else:
+                v = a if breaks_a <= breaks_b else b
+        
+        elif not b or np.random.random() > 0.5:  # choose a random literal
+            v = a
+        else:
+            v = b
+        
+        value[v] ^= 1  # and flip it
+        for i in range(occ_offsets[v], occ_offsets[v+1]):
+            c = occ_clauses[i]
+            if (occ_literals[i] > 0) == value[v]:  # literal became true
+                num_true[c] += 1
+                if num_true[c] == 1:  # remove c from unsat
+                    n -= 1
+                    last = unsat[n]
+                    if last != c:
+                        unsat[position[c]] = last
+                        position[last] = position[c]
+                    position[c] = -1
+            else:  # literal became false
+                num_true[c] -= 1
+                if num_true[c] == 0:  # add c to unsat
+                    position[c] = n
+                    unsat[n] = c
+                    n += 1
+    
+    num_unsat[0] = n
+    return num_steps
+
+
+@jit
+def reach_kernel(offsets, targets, start, seen, stack):
+    """
+    Mark the nodes reachable from start, itself included, in seen.
+    
+    Input:  int64 array of offsets, int32 array of targets (CSR), int
+            uint8 seen and int32 stack, one per node (seen all 0)
+    Output: int, number of nodes marked
+    """
+    seen[start] = 1
+    stack[0] = start
+    top = 1
+    num_seen = 1
+    while top:
+        top -= 1
+        node = stack[top]
+        for edge in range(offsets[node], offsets[node+1]):
+            successor = targets[edge]
+            if not seen[successor]:
+                seen[successor] = 1
+                stack[top] = successor
+                top += 1
+                num_seen += 1
+    return num_seen
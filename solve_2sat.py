@@ -12,7 +12,23 @@ Created on Sat Nov  9 11:22:22 2019
 @author: HKXIE
 """
 
-import io, time
+import bz2, contextlib, gc, gzip, hashlib, io, lzma, mmap, os, signal, \
+    struct, sys, tempfile, time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, \
+    as_completed, wait
+from functools import partial
+from itertools import accumulate, chain, compress, count, islice
+from multiprocessing import Pool, shared_memory
+from operator import not_, sub
+
+try:  # optional, only used to sort and count edges in bulk
+    import numpy as np
+except ImportError:
+    np = None
+
+import kernels  # compiled inner loops, if Numba is installed
 
 
 class My2SATSolver:
@@ -32,6 +48,290 @@ class My2SATSolver:
             self.is_sat = None
             self.time_taken = None
             self.assignments = None
+            self.profile = None  # Profile, if solved with profile=True
+            self.certificate = None  # if UNSAT and solved with certificate
+            self.verified = None  # if SAT and solved with verify
+    
+    
+    class ImplicationGraph:
+        """
+        Implication graph in compressed sparse row (CSR) form.
+        
+        The literal x of variable v = |x| is node 2v if x > 0 and 2v+1 if
+        x < 0, so the negation of node u is u^1. The successors of node u
+        are targets[offsets[u]:offsets[u+1]], sorted and without duplicates.
+        """
+        def __init__(self, num_vars, offsets, targets, num_duplicates=0):
+            self.num_vars = num_vars
+            self.num_nodes = 2*(num_vars+1)
+            self.offsets = offsets  # array("q") of length num_nodes+1
+            self.targets = targets  # array("i") of length num_edges
+            self.num_duplicates = num_duplicates
+        
+        @property
+        def num_edges(self):
+            return len(self.targets)
+        
+        def successors(self, node):
+            return self.targets[self.offsets[node]:self.offsets[node+1]]
+        
+        @classmethod
+        def from_edges(cls, num_vars, sources, targets):
+            """
+            Build the CSR arrays from parallel edge arrays, removing duplicate
+            edges by sorting packed (source, target) keys, or without NumPy, 
+            by a counting sort on sources and sorting each successor list.
+            
+            Input:  int, array("i") of sources, array("i") of targets
+            Output: My2SATSolver.ImplicationGraph
+            """
+            num_nodes = 2*(num_vars+1)
+            num_edges = len(sources)
+            offsets = array("q")
+            
+            if np is not None:
+                keys = np.frombuffer(sources, dtype=np.int32).astype(np.int64)
+                keys *= num_nodes
+                keys += np.frombuffer(targets, dtype=np.int32)
+                keys = np.unique(keys)  # sorts, then drops duplicates
+                counts = np.bincount(keys // num_nodes, minlength=num_nodes)
+                offsets.append(0)
+                offsets.frombytes(np.cumsum(counts, dtype=np.int64).tobytes())
+                targets = array("i")
+                targets.frombytes((keys % num_nodes).astype(np.int32).tobytes())
+            
+            else:  # counting sort by source, then sort each successor list
+                counts = [0] * (num_nodes+1)
+                for s in sources:
+                    counts[s+1] += 1
+                starts = array("q", accumulate(counts))
+                position = starts[:-1]
+                buckets = array("i", bytes(4*num_edges))
+                for s, t in zip(sources, targets):
+                    buckets[position[s]] = t
+                    position[s] += 1
+                
+                targets = array("i")
+                offsets.append(0)
+                for node in range(num_nodes):
+                    targets.extend(sorted(set(
+                        buckets[starts[node]:starts[node+1]])))
+                    offsets.append(len(targets))
+            
+            return cls(num_vars, offsets, targets, num_edges-len(targets))
+    
+    
+    class ClauseStream:
+        """
+        Lazily parses the clauses of a cnf input, one line at a time.
+        
+        Iterating yields 1-tuples or 2-tuples (a,) or (b,c), without keeping
+        them. On a parse error the message is printed, iteration stops and 
+        error is set to True, so check it once the stream is consumed. If
+        strict, a ParseError is raised instead, and nothing is printed.
+        
+        Input: str (cnf text) OR file object (cnf file, e.g. sys.stdin,
+               binary ones are decompressed, see decompress_stream)
+               OR any iterator of lines (str or bytes)
+               start: number of lines before the first, for messages
+        """
+        def __init__(self, cnf, strict=False, start=0):
+            if isinstance(cnf, str):
+                cnf = cnf.splitlines()
+            elif isinstance(cnf, (io.BufferedIOBase, io.RawIOBase)):
+                cnf = decompress_stream(cnf)
+            self.lines = cnf
+            self.num_var = 0  # as stated in the problem statement
+            self.num_clause = 0
+            self.var = []  # variables in order of appearance
+            self.seen = set()  # same variables as var, for O(1) lookups
+            self.num_clauses = 0  # clauses given so far
+            self.error = False
+            self.strict = strict
+            self.start = start
+        
+        def __iter__(self):
+            fmt = None
+            seen = self.seen
+            
+            for i, line in enumerate(self.lines, self.start):
+                if isinstance(line, bytes):  # binary stream
+                    line = line.decode()
+                
+                if fmt != "cnf":
+                    if line.startswith("c"):  # preamble
+                        continue
+                    
+                    if not line.startswith("p"):
+                        return self._fail("invalid problem statement", 
+                                          line=i+1)
+                    
+                    try:  # problem statement
+                        _, fmt, num_var, num_clause = line.split()
+                    except ValueError:
+                        return self._fail("invalid problem statement", 
+                                          line=i+1)
+                    if fmt != "cnf":
+                        return self._fail("only support cnf format", 
+                                          line=i+1)
+                    try:
+                        self.num_var = int(num_var)
+                    except ValueError:
+                        return self._fail("invalid number of variables", 
+                                          line=i+1)
+                    try:
+                        self.num_clause = int(num_clause)
+                    except ValueError:
+                        return self._fail("invalid number of clauses", 
+                                          line=i+1)
+                
+                elif line in ("", "\n"):
+                    continue
+                
+                else:  # clauses
+                    try:
+                        *b, z = line.split()
+                    except ValueError:
+                        return self._fail("error at line " + str(i+1) + 
+                                          ": '" + line + "'", line=i+1)
+                    
+                    if z != "0":
+                        return self._fail("clause at line " + str(i+1) + 
+                                          " ends with invalid character " + 
+                                          str(z) + ", expected 0", line=i+1)
+                    
+                    if len(b) == 0:
+                        return self._fail("empty clause at line " + str(i+1),
+                                          "FORMULA UNSATISFIABLE", line=i+1)
+                    
+                    if len(b) > 2:
+                        return self._fail("line " + str(i+1) + "has " + 
+                                          str(b) + " literals, expected " +
+                                          "<= 2 literals in 2-SAT problem", 
+                                          line=i+1)
+                    
+                    for j in range(len(b)):
+                        try:
+                            b[j] = int(b[j])
+                        except ValueError:
+                            return self._fail("invalid literal at line " + 
+                                              str(i+1) + ": " + str(b[j]) + 
+                                              ", expected an integer", 
+                                              line=i+1)
+                        if abs(b[j]) >= 2**31:  # as in parse_cnf_bulk
+                            return self._fail("literal out of range at "
+                                              "line " + str(i+1) + ": " + 
+                                              str(b[j]), line=i+1)
+                        if abs(b[j]) not in seen:
+                            seen.add(abs(b[j]))
+                            self.var.append(abs(b[j]))
+                    
+                    self.num_clauses += 1
+                    yield tuple(b)
+        
+        def _fail(self, *messages, line=None):
+            if self.strict:
+                raise ParseError(messages[0], line)
+            for message in messages:
+                print(message)
+            self.error = True
+        
+        def check_counts(self):
+            """Print the mismatches between stated and given counts."""
+            if self.num_var != len(self.var):
+                print("stated " + str(self.num_var) + " but gave " + 
+                      str(len(self.var)) + " variables. missing:")
+                print_long(" ".join(str(i) for i in range(1, self.num_var+1) 
+                               if i not in self.seen),
+                           max_lines=1, indent=2)
+            
+            if self.num_clause != self.num_clauses:
+                print("stated " + str(self.num_clause) + " but gave " + 
+                      str(self.num_clauses) + " clauses")
+    
+    
+    class Simplification:
+        """
+        A formula reduced by simplify, and how to map its solution back.
+        
+        fixed holds the variables set by unit propagation or as pure 
+        literals, and equivalent maps each substituted variable to the 
+        literal it equals. Variables in neither and not in clauses occur
+        in no remaining clause, so any value will do.
+        """
+        def __init__(self, var, clauses):
+            self.var = var
+            self.clauses = clauses  # list of 1-tuples or 2-tuples
+            self.fixed = {}  # variable mapped to 0 or 1
+            self.equivalent = {}  # variable mapped to a literal
+            self.is_unsat = False
+        
+        def find(self, literal):
+            """Literal that stands for literal after substitution."""
+            v = abs(literal)
+            while v in self.equivalent:
+                literal = self.equivalent[v] if literal > 0 \
+                    else -self.equivalent[v]
+                v = abs(literal)
+            return literal
+        
+        def expand(self, assignments):
+            """
+            Extend an assignment of the reduced formula to every variable.
+            
+            Input:  dict of variables mapped to 0 or 1
+            Output: dict of variables mapped to 0 or 1, sorted by variable
+            """
+            values = dict(self.fixed)
+            values.update(assignments)
+            
+            expanded = {}
+            for v in sorted(self.var):
+                literal = self.find(v)
+                value = values.get(abs(literal), 0)
+                expanded[v] = value if literal > 0 else 1-value
+            return expanded
+    
+    
+    class DFSTrace:
+        """
+        What Tarjan's DFS knows about paths, kept when tarjan_scc or 
+        tarjan_scc_csr is given a trace: the tree parent of each node, and 
+        the edge that last lowered its lowlink, whose tail is the node or a
+        descendant, and whose head is on the stack and indexed lower.
+        
+        Within an SCC, the root reaches every node down the tree, and every
+        node reaches the root by following lowlink edges, each landing on
+        a node indexed lower. So paths come out in O(path length).
+        """
+        def __init__(self):
+            self.parent = self.low_tail = self.low_head = None
+            self.literal = self.node = lambda x: x  # dict graph: literals
+        
+        def start(self, parent, low_tail, low_head, literal=None, node=None):
+            self.parent = parent
+            self.low_tail = low_tail
+            self.low_head = low_head
+            if literal is not None:  # CSR graph: node ids
+                self.literal, self.node = literal, node
+            return parent, low_tail, low_head
+        
+        def down(self, root, node):
+            """Tree path from root to a node in its subtree."""
+            path = [node]
+            while node != root:
+                node = self.parent[node]
+                path.append(node)
+            return path[::-1]
+        
+        def up(self, node, root):
+            """Path from a node of an SCC to the root of that SCC."""
+            path = [node]
+            while node != root:
+                path.extend(self.down(node, self.low_tail[node])[1:])
+                node = self.low_head[node]
+                path.append(node)
+            return path
     
     
     @staticmethod
@@ -43,48 +343,202 @@ class My2SATSolver:
                   test_case.time_taken,
                   sep=",")
     
-        
+    
     @staticmethod
-    def solve(cnf):
+    def solve(cnf, csr=False, stream=False, profile=False, hook=None, 
+              simplify=False, cache=None, memo=None, certificate=False,
+              verify=False, parallel=False):
         """
         Solve a 2-SAT problem.
         
         Uses strongly-connected components to find satisfiability.
         
         Input: str (cnf text) OR file object (cnf file)
+               csr: parse with parse_cnf_bulk and build the compact 
+                    array-backed graph instead of the dict
+               stream: parse lazily straight into the compact graph, without
+                       a clause list (any iterator of lines is accepted, and 
+                       parsing is then included in the time taken)
+               profile: time each phase and count edges and SCCs into
+                        test_case.profile (see Profile)
+               hook: called as hook(name, value) with each phase time and
+                     counter as it is measured, implies profile
+               simplify: reduce the clauses with simplify before building
+                         the graph
+               cache: InstanceCache to load the parsed clauses and compact
+                      graph from, or store them in (implies csr)
+               memo: ResultCache to look the answer up in before building
+                     the graph, or to remember it in
+               certificate: if UNSAT, keep the cycle x => ... => -x => ... 
+                            => x found by the SCC pass in 
+                            test_case.certificate, and print it (see 
+                            certificate, not kept for answers from memo,
+                            and not with simplify, whose clauses are not
+                            the input's, a ValueError)
+               verify: check the assignment against every clause with
+                       verify_assignment, after timing
+               parallel: find the SCCs of the compact graph with 
+                         tarjan_scc_parallel, on that many processes (as
+                         many as CPUs if True), not with certificate
+        
+        stream keeps no clauses, so it can't be combined with simplify,
+        cache, memo or verify, a ValueError.
         """
+        if certificate and simplify:
+            raise ValueError("a certificate must cite the input clauses, "
+                             "not simplified ones")
+        if stream:
+            given = [name for name, value in 
+                     (("simplify", simplify), ("cache", cache), 
+                      ("memo", memo), ("verify", verify))
+                     if value not in (False, None)]
+            if given:
+                raise ValueError("stream keeps no clauses for " + 
+                                 ", ".join(given))
         test_case = My2SATSolver.TestCase()
-        result = My2SATSolver.parse_cnf(cnf)
-        if not result:  # failed to parse, return None
-            return None
-        var, clauses = result
-        test_case.num_vars = len(var)
-        test_case.num_clauses = len(clauses)
+        stats = Profile(hook) if profile or hook else None
+        reduced = None
+        key = None
+        if stream:
+            clauses = My2SATSolver.ClauseStream(cnf)
+            start_time = time.time()  # start timing here
+            graph = My2SATSolver.create_csr_graph(clauses)
+            if clauses.error:  # failed to parse, return None
+                return None
+            if stats:  # parsing is interleaved with the graph build
+                stats.lap("graph")
+            clauses.check_counts()
+            test_case.num_vars = len(clauses.var)
+            test_case.num_clauses = clauses.num_clauses
         
-        start_time = time.time()  # start timing here
-        graph = My2SATSolver.create_graph(clauses)
-        sccs = My2SATSolver.tarjan_scc(graph)
-        
-        assignments = {}
-        for scc in sccs:
-            for node in scc:
-                if -node in scc:  # literal and its negation are present
-                    print("FORMULA UNSATISFIABLE")
-                    test_case.is_sat = "UNSAT"
-                    end_time = time.time()
-                    time_taken = end_time-start_time
+        else:
+            if cache is not None:
+                result = cache.get(cnf)
+                csr = True
+            elif csr:
+                result = My2SATSolver.parse_cnf_bulk(cnf)
+            else:
+                result = My2SATSolver.parse_cnf(cnf)
+            if not result:  # failed to parse, return None
+                return None
+            if cache is not None:
+                var, literals, lengths, graph = result
+                num_clauses = len(lengths)
+            elif csr:
+                var, literals, lengths = result
+                num_clauses = len(lengths)
+            else:
+                var, clauses = result
+                num_clauses = len(clauses)
+            test_case.num_vars = len(var)
+            test_case.num_clauses = num_clauses
+            if verify:  # the clauses as given, before simplify
+                checked = (literals, lengths) if csr \
+                    else flatten_clauses(clauses)
+            if stats:
+                stats.lap("parse")
+            
+            start_time = time.time()  # start timing here
+            if memo is not None:
+                if csr:
+                    key = ResultCache.key_bulk(literals, lengths)
+                else:
+                    key = ResultCache.key(clauses)
+                cached = memo.get(key)
+                if stats:
+                    stats.lap("memo")
+                    test_case.profile = stats
+                
+                if cached is not None:  # solved before, skip the graph
+                    is_sat, assignments = cached
+                    time_taken = time.time()-start_time
+                    test_case.is_sat = is_sat
                     test_case.time_taken = time_taken
+                    test_case.assignments = assignments
+                    
+                    if is_sat == "UNSAT":
+                        print("FORMULA UNSATISFIABLE")
+                    else:
+                        print("FORMULA SATISFIABLE")
+                        print_long(" ".join(map(str, assignments.values())))
                     print("time taken: " + format_time(time_taken))
+                    if verify and is_sat == "SAT":  # trust, but verify
+                        My2SATSolver._verify(test_case, checked, stats)
                     return test_case
-                if node not in assignments:  # assign the literal to true
-                    assignments[node] = 1
-                    assignments[-node] = 0  # and its negation to false
+            
+            if simplify:
+                if csr:
+                    clauses = list(iter_clauses(literals, lengths))
+                reduced = My2SATSolver.simplify(var, clauses)
+                clauses = reduced.clauses
+                num_clauses = len(clauses)
+                if stats:
+                    stats.lap("simplify")
+                    stats.count("num_simplified_clauses", num_clauses)
+            
+            if simplify and csr:
+                graph = My2SATSolver.create_csr_graph(clauses, 
+                                                      max(var, default=0))
+            elif cache is not None:  # already compiled
+                pass
+            elif csr:
+                graph = My2SATSolver.create_csr_graph_bulk(
+                    literals, lengths, max(var, default=0))
+            else:
+                graph = My2SATSolver.create_graph(clauses)
+            if stats:
+                stats.lap("graph")
+        
+        trace = My2SATSolver.DFSTrace() if certificate else None
+        if parallel and trace is None and \
+                isinstance(graph, My2SATSolver.ImplicationGraph):
+            sccs = [tuple(map(to_literal, scc)) for scc in 
+                    My2SATSolver.tarjan_scc_parallel(
+                        graph, None if parallel is True else parallel)]
+        else:
+            sccs = My2SATSolver.tarjan_scc(graph, stats, trace)
+        if stats:
+            stats.lap("scc")
+        consistent = My2SATSolver.is_consistent(sccs)
+        if reduced is not None and reduced.is_unsat:
+            consistent = False  # conflict found while simplifying
+        if stats:
+            stats.lap("check")
+        assignments = My2SATSolver.assign(sccs, check=False) \
+            if consistent else None
+        if reduced is not None and assignments is not None:
+            assignments = reduced.expand(assignments)
         
         end_time = time.time()  # stop timing here
         time_taken = end_time-start_time
         
-        # sort assignments by increasing order, getting rid of negative literals
-        assignments = {k:assignments[k] for k in sorted(assignments) if k > 0}
+        if stats:
+            stats.lap("assign")
+            if isinstance(graph, My2SATSolver.ImplicationGraph):
+                stats.count("num_edges", graph.num_edges)
+                stats.count("num_duplicates", graph.num_duplicates)
+            else:  # the dict graph drops duplicates without counting them
+                stats.count("num_edges", sum(map(len, graph.values())))
+            stats.count("num_sccs", len(sccs))
+            stats.count("largest_scc", max(map(len, sccs), default=0))
+            test_case.profile = stats
+        
+        if key is not None:
+            memo.put(key, "UNSAT" if assignments is None else "SAT", 
+                     assignments)
+        
+        if assignments is None:  # literal and its negation are present
+            print("FORMULA UNSATISFIABLE")
+            test_case.is_sat = "UNSAT"
+            test_case.time_taken = time_taken
+            if trace is not None and not consistent:
+                steps = My2SATSolver.certificate(sccs, trace)
+                test_case.certificate = steps
+                if steps:
+                    print_long(" => ".join(str(a) for a, _, _ in steps) + 
+                               " => " + str(steps[-1][1]))
+            print("time taken: " + format_time(time_taken))
+            return test_case
         
         test_case.is_sat = "SAT"
         test_case.time_taken = time_taken
@@ -94,225 +548,2684 @@ class My2SATSolver:
         print_long(" ".join(map(str, assignments.values())))
         print("time taken: " + format_time(time_taken))
         
+        if verify:
+            My2SATSolver._verify(test_case, checked, stats)
+        
         return test_case
     
     
     @staticmethod
-    def solve_all(*cnf_paths):
+    def _verify(test_case, checked, stats=None):
+        """Check the assignments of test_case against the given clauses."""
+        violated = verify_assignment(*checked, 
+                                     to_bits(test_case.assignments))
+        test_case.verified = not violated
+        if violated:
+            print("assignment violates " + str(len(violated)) + 
+                  " clauses, first clause " + str(violated[0]+1))
+        if stats:
+            stats.lap("verify")
+    
+    
+    @staticmethod
+    def is_consistent(sccs):
+        """
+        Check that no literal shares an SCC with its negation.
+        
+        Input:  list of tuples of int, as output by tarjan_scc
+        Output: bool
+        """
+        for scc in sccs:
+            if len(scc) > 1:  # a single literal can't hold its negation
+                members = set(scc)
+                if any(-node in members for node in scc):
+                    return False
+        return True
+    
+    
+    @staticmethod
+    def assign(sccs, check=True):
+        """
+        Read an assignment off SCCs in reverse topological order: the first
+        SCC to contain a literal makes it true, and its negation false.
+        
+        Input:  list of tuples of int, as output by tarjan_scc
+                check: first check the SCCs with is_consistent
+        Output: dict of variables mapped to 0 or 1, sorted by variable
+                OR None if a literal and its negation share an SCC
+        """
+        if check and not My2SATSolver.is_consistent(sccs):
+            return None
+        
+        assignments = {}
+        for scc in sccs:
+            for node in scc:
+                if node not in assignments:  # assign the literal to true
+                    assignments[node] = 1
+                    assignments[-node] = 0  # and its negation to false
+        
+        # sort assignments by increasing order, getting rid of negative literals
+        return {k:assignments[k] for k in sorted(assignments) if k > 0}
+    
+    
+    @staticmethod
+    def certificate(sccs, trace):
+        """
+        Proof of unsatisfiability read off the SCCs and DFS trace: a cycle
+        x => ... => -x => ... => x through the SCC that holds a literal x
+        and its negation, each step with the clause that gives the edge.
+        
+        Input:  list of tuples of int, as output by tarjan_scc with trace
+                My2SATSolver.DFSTrace
+        Output: list of (a, b, clause) for each step a => b of the cycle,
+                the clause being (-a,b), or (b,) if a = -b
+                OR None if no SCC holds a literal and its negation
+        """
+        for scc in sccs:
+            if len(scc) < 2:
+                continue
+            members = set(scc)
+            x = next((node for node in scc if -node in members), None)
+            if x is None:
+                continue
+            
+            node, root = trace.node, trace.node(scc[-1])
+            there = trace.up(node(x), root) + trace.down(root, node(-x))[1:]
+            there = there[:there.index(node(-x))+1]  # stop at the first -x
+            back = trace.up(node(-x), root) + trace.down(root, node(x))[1:]
+            back = back[:back.index(node(x))+1]
+            cycle = list(map(trace.literal, there + back[1:]))
+            return [(a, b, (b,) if a == -b else (-a, b)) 
+                    for a, b in zip(cycle, cycle[1:])]
+        return None
+    
+    
+    @staticmethod
+    def solve_all(*cnf_paths, verify=False):
         """
         Solve all provided 2-SAT problems one by one.
         
-        Input: str (any number of .cnf file paths)
+        Input: str (any number of .cnf file paths, which may be gzip, xz
+               or bzip2 compressed, "-" for the standard input)
+               verify: check each assignment, see solve
         """
         My2SATSolver.test_cases.clear()
         for cnf_path in cnf_paths:
-            with open(cnf_path, "r") as f:
-                cnf_name = cnf_path.rsplit("/", 1)[1]
+            with open_cnf(cnf_path) as f:
+                cnf_name = cnf_name_of(cnf_path)
                 print("solving " + cnf_name)
-                test_case = My2SATSolver.solve(f)
+                test_case = My2SATSolver.solve(f, verify=verify)
                 test_case.name = cnf_name
                 My2SATSolver.test_cases.append(test_case)
                 print()
     
     
     @staticmethod
-    def parse_cnf(cnf):
+    def solve_parallel(*cnf_paths, num_workers=None, timeout=None, 
+                       ordered=False):
         """
-        Takes in cnf file and outputs its set of clauses.
+        Solve all provided 2-SAT problems on a pool of worker processes.
         
-        Input:  str (cnf text) OR file object (cnf file)
-        Output: list of 1-tuples or 2-tuples [(a,), (b,c), ...]
+        Unlike solve_all, nothing is printed or stored in test_cases, so it
+        is safe to call from several threads.
+        
+        Input:  str (any number of .cnf file paths)
+                num_workers: number of processes (defaults to the CPU count)
+                timeout: seconds per instance, after which is_sat is TIMEOUT
+                ordered: yield in input order instead of as completed
+        Output: generator of TestCase (is_sat is ERROR if the file could
+                not be read or parsed)
+        """
+        return run_parallel(My2SATSolver, cnf_paths, num_workers, timeout, 
+                            ordered)
+    
+    
+    @staticmethod
+    def solve_components(cnf, num_workers=1):
         """
-        num_var = 0
-        num_clause = 0
-        var = []
-        fmt = None
-        clauses = []
+        Solve a 2-SAT problem one independent component at a time.
         
-        if isinstance(cnf, io.TextIOBase):
-            lines = cnf
+        Variables sharing a clause are joined with union-find (see 
+        decompose), then each component is solved on its own, stopping at
+        the first UNSAT component.
         
-        elif isinstance(cnf, str):
-            lines = cnf.splitlines()
+        Input: str (cnf text) OR file object (cnf file)
+               num_workers: solve the components on that many processes 
+                            (None for the CPU count, 1 for in-process)
+        """
+        test_case = My2SATSolver.TestCase()
+        result = My2SATSolver.parse_cnf(cnf)
+        if not result:  # failed to parse, return None
+            return None
+        var, clauses = result
+        test_case.num_vars = len(var)
+        test_case.num_clauses = len(clauses)
         
-        for i, line in enumerate(lines):        
-            if fmt != "cnf":
-                if line.startswith("c"):  # preamble
-                    continue
-                
-                if not line.startswith("p"):
-                    print("invalid problem statement")
-                    return None
-                
-                else:
-                    try:  # problem statement
-                        _, fmt, num_var, num_clause = line.split()
-                    except ValueError:
-                        print("invalid problem statement")
-                        return None
-                    if fmt != "cnf":
-                        print("only support cnf format")
-                        return None
-                    try:
-                        num_var = int(num_var)
-                    except ValueError:
-                        print("invalid number of variables")
-                        return None
-                    try:
-                        num_clause = int(num_clause)
-                    except ValueError:
-                        print("invalid number of clauses")
-                        return None
-            
-            elif line in ("", "\n"):
-                continue
-            
-            else:  # clauses
-                try:
-                    *b, z = line.split()
-                except ValueError:
-                    print("error at line " + str(i+1) + ": '" + line + "'")
-                    return None
-    
-                if z != "0":
-                    print("clause at line " + str(i+1) + 
-                          " ends with invalid character " + str(z) +
-                          ", expected 0")
-                    return None
-                
-                if len(b) == 0:
-                    print("empty clause at line " + str(i+1))
-                    print("FORMULA UNSATISFIABLE")
-                    return None
-                
-                if len(b) > 2:
-                    print("line " + str(i+1) + "has " + str(b) + " literals, " +
-                          "expected <= 2 literals in 2-SAT problem")
-                    return None
-                
-                else:
-                    for i in range(len(b)):
-                        try:
-                            b[i] = int(b[i])
-                        except ValueError:
-                            print("invalid literal at line " + str(i+1) + ": " +
-                                  str(b[0]) + ", expected an integer")
-                            return None
-                        if abs(b[i]) not in var:
-                            var.append(abs(b[i]))
-                    if len(b) == 1:
-                        clauses.append((b[0],))
-                    else:
-                        clauses.append((b[0], b[1]))
+        start_time = time.time()  # start timing here
+        components = decompose(clauses)
+        _, assignments, _ = run_components(My2SATSolver.solve_component, 
+                                           components, num_workers)
+        end_time = time.time()  # stop timing here
+        time_taken = end_time-start_time
         
-        if num_var != len(var):
-            print("stated " + str(num_var) + " but gave " + 
-                  str(len(var)) + " variables. missing:")
-            print_long(" ".join(str(i) for i in range(1, num_var+1) 
-                           if i not in var),
-                       max_lines=1, indent=2)
+        test_case.time_taken = time_taken
+        if assignments is None:
+            print("FORMULA UNSATISFIABLE")
+            test_case.is_sat = "UNSAT"
+            print("time taken: " + format_time(time_taken))
+            return test_case
         
-        if num_clause != len(clauses):
-            print("stated " + str(num_clause) + " but gave " + 
-                  str(len(clauses)) + " clauses")
-
-        return var, clauses
+        test_case.is_sat = "SAT"
+        test_case.assignments = assignments
+        
+        print("FORMULA SATISFIABLE")  # print outputs
+        print_long(" ".join(map(str, assignments.values())))
+        print("time taken: " + format_time(time_taken))
+        
+        return test_case
+    
+    
+    @staticmethod
+    def solve_component(var, clauses):
+        """
+        Quietly solve one component, as a worker of run_components.
         
+        Output: SAT and a dict of variables mapped to 0 or 1, OR UNSAT and
+                None, then None (steps are not counted)
+        """
+        graph = My2SATSolver.create_graph(clauses)
+        assignments = My2SATSolver.assign(My2SATSolver.tarjan_scc(graph))
+        return "UNSAT" if assignments is None else "SAT", assignments, None
+    
     
     @staticmethod
-    def create_graph(clauses):
+    def solve_quiet(cnf):
         """
-        Takes in a set of clauses and outputs the adjacency list 
-        of the implication graph which can be formed with the clauses.
+        Solve a 2-SAT problem without printing anything, for use as a 
+        library. The model is kept as a bit array, with no dict or string
+        built over the variables.
         
-        Input: list of 1-tuples or 2-tuples [(a,), (b,c), ...]
-        Output: dict of int mapped to list of int {a:[b], c:[d,e], ...}
+        Input:  str (cnf text) OR bytes OR file object (cnf file)
+        Output: Result
+        Raises: ParseError if cnf is not a valid 2-SAT problem
         """
-        graph = {}
+        start_time = time.time()
+        graph, num_vars, num_clauses = My2SATSolver.compile_quiet(cnf)
+        sccs = My2SATSolver.tarjan_scc_csr(graph)
+        model = My2SATSolver.assign_bits(graph, sccs)
+        return Result(model is not None, num_vars, num_clauses, 
+                      graph.num_vars, model, time.time()-start_time)
+    
+    
+    @staticmethod
+    def solve_out_of_core(cnf, budget=2**28, directory=None):
+        """
+        Same as solve_quiet, for formulas whose graph does not fit in 
+        memory: see OutOfCore.
         
-        for clause in clauses:
-            if len(clause) == 2:
-                a, b = clause
-            else:  # length 1
-                a = b = clause[0]
-            
-            if -a not in graph:  # initialize adjacency list of node
-                graph[-a] = []
-            if b not in graph[-a]:  # prevent duplicate successors
-                graph[-a].append(b)
-            
-            if -b not in graph:
-                graph[-b] = []
-            if a not in graph[-b]:
-                graph[-b].append(a)
-            
-        return graph
+        Input:  str (path of a .cnf file) OR binary file object
+                budget: bytes of memory to use, besides mapped files
+                directory: where to put the scratch files (defaults to the
+                           system's temporary directory)
+        Output: Result
+        Raises: ParseError if cnf is not a valid 2-SAT problem
+        """
+        return OutOfCore(directory, budget).solve(cnf)
     
     
     @staticmethod
-    def tarjan_scc(graph):
+    def compile_quiet(cnf):
         """
-        Tarjan's Algorithm (named for its discoverer, Robert Tarjan) is a 
-        graph theory algorithm for finding the strongly connected components
-        of a graph.
+        Parse a cnf input into its compact graph without printing, as the
+        first half of solve_quiet.
         
-        Based on: http://www.logarithmic.net/pfh/blog/01208083168
+        Input:  str (cnf text) OR bytes OR file object (cnf file)
+        Output: My2SATSolver.ImplicationGraph, number of variables given,
+                number of clauses given
+        Raises: ParseError if cnf is not a valid 2-SAT problem
         """
-        # initialize variables
-        index_ctr = [0]
-        lowlinks = {}
-        index = {}
-        stack = []
-        sccs = [] 
-                
-        def DFS_visit(node):      
-            index[node] = index_ctr[0]
-            lowlinks[node] = index_ctr[0] # initialize lowlink to index
-            index_ctr[0] += 1
-            stack.append(node)
-            
+        data = read_cnf_bytes(cnf)
+        parsed = My2SATSolver._parse_cnf_bytes(data, quiet=True)
+        if parsed is None:  # irregular, find the error line by line
             try:
-                successors = graph[node]
-            except:
-                successors = []
-            
-            for successor in successors:
-                # tree edge: visit and update lowlinks
-                if successor not in lowlinks:
-                    DFS_visit(successor)
-                    lowlinks[node] = min(lowlinks[node],lowlinks[successor])
-                
-                 # back edge: don't visit, but compare its index with lowlink
-                elif successor in stack:
-                    lowlinks[node] = min(lowlinks[node],index[successor])
-                
-                # cross edge: ignore. move on to next successor
-                else:
-                    continue
-                    
-            # root node to SCC found. pop SCC off stack.
-            if lowlinks[node] == index[node]:
-                scc = []
-                
-                while True:
-                    successor = stack.pop()
-                    scc.append(successor)
-                    if successor == node: break
-                
-                sccs.append(tuple(scc))
+                clauses = My2SATSolver.ClauseStream(data.decode(), 
+                                                    strict=True)
+            except UnicodeDecodeError:
+                raise ParseError("input is not text") from None
+            try:
+                graph = My2SATSolver.create_csr_graph(clauses)
+            except OverflowError:
+                raise ParseError("literal out of range") from None
+            return graph, len(clauses.var), clauses.num_clauses
         
-        # visit all unvisited nodes
-        for node in graph:
-            if node not in lowlinks:
-                DFS_visit(node)
+        var, literals, lengths = parsed
+        graph = My2SATSolver.create_csr_graph_bulk(literals, lengths, 
+                                                   max(var, default=0))
+        return graph, len(var), len(lengths)
+    
+    
+    @staticmethod
+    def assign_bits(graph, sccs):
+        """
+        Same assignment as assign, as a bit array: the literal whose SCC 
+        comes first in reverse topological order is true.
         
-        return sccs
-
-
-def format_time(time_taken):
-    units = ["s", "ms", "μs", "ns", "ps"]
-    i = 0
-    while time_taken < 0.01:
+        Input:  My2SATSolver.ImplicationGraph, SCCs from tarjan_scc_csr
+        Output: bytearray, bit v%8 of byte v//8 set if variable v is true
+                OR None if a literal and its negation share an SCC
+        """
+        num_vars = graph.num_vars
+        if np is not None:
+            comp = np.full(graph.num_nodes, len(sccs), dtype=np.int64)
+            sizes = np.fromiter(map(len, sccs), dtype=np.int64, 
+                                count=len(sccs))
+            nodes = np.fromiter(chain.from_iterable(sccs), dtype=np.int64,
+                                count=int(sizes.sum()))
+            comp[nodes] = np.repeat(np.arange(len(sccs)), sizes)
+            positive, negative = comp[0::2], comp[1::2]
+            if np.any((positive == negative) & (positive < len(sccs))):
+                return None
+            return bytearray(np.packbits(positive < negative, 
+                                         bitorder="little").tobytes())
+        
+        comp = array("q", [len(sccs)]) * graph.num_nodes  # none yet
+        for i, scc in enumerate(sccs):
+            for node in scc:
+                comp[node] = i
+        model = bytearray(num_vars//8 + 1)
+        for v in range(1, num_vars+1):
+            positive, negative = comp[2*v], comp[2*v+1]
+            if positive == negative < len(sccs):
+                return None
+            if positive < negative:
+                model[v >> 3] |= 1 << (v & 7)
+        return model
+    
+    
+    @staticmethod
+    def parse_cnf(cnf):
+        """
+        Takes in cnf file and outputs its set of clauses.
+        
+        Input:  str (cnf text) OR file object (cnf file, text or binary,
+                binary ones may be gzip, xz or bzip2 compressed)
+                OR any iterator of lines (str or bytes)
+        Output: list of 1-tuples or 2-tuples [(a,), (b,c), ...]
+        """
+        stream = My2SATSolver.ClauseStream(cnf)
+        clauses = list(stream)
+        if stream.error:  # failed to parse, return None
+            return None
+        stream.check_counts()
+        return stream.var, clauses
+    
+    
+    @staticmethod
+    def parse_cnf_bulk(cnf):
+        """
+        Fast path of parse_cnf for large cnf files.
+        
+        Reads the whole file as bytes and tokenizes all clause lines at once,
+        checking that every line ends with its only 0 by counting. Variables
+        are tracked in a bitmap instead of a list. If anything is irregular,
+        falls back to parse_cnf so that the same error messages are printed.
+        
+        Input:  str (cnf text) OR bytes OR file object (cnf file)
+        Output: list of variables, array("i") of literals, 
+                array("b") of clause lengths (1 or 2)
+        """
+        data = read_cnf_bytes(cnf)
+        result = My2SATSolver._parse_cnf_bytes(data)
+        if result is not None:
+            return result
+        
+        result = My2SATSolver.parse_cnf(data.decode())
+        if not result:  # failed to parse, return None
+            return None
+        var, clauses = result
+        literals = array("i")
+        lengths = array("b")
+        for clause in clauses:
+            try:
+                literals.extend(clause)
+            except OverflowError:
+                print("literal out of range in clause " + str(clause))
+                return None
+            lengths.append(len(clause))
+        return var, literals, lengths
+    
+    
+    @staticmethod
+    def _parse_cnf_bytes(data, quiet=False):
+        """
+        Fast path of parse_cnf_bulk, returns None instead of any error. 
+        Count mismatches are printed unless quiet.
+        """
+        pos = 0
+        while True:  # skip the preamble
+            end = data.find(b"\n", pos)
+            if end < 0:
+                end = len(data)
+            line = data[pos:end]
+            if not line.startswith(b"c"):
+                break
+            if end == len(data):
+                return None
+            pos = end+1
+        
+        fields = line.split()  # problem statement
+        if len(fields) != 4 or fields[:2] != [b"p", b"cnf"]:
+            return None
+        try:
+            num_var = int(fields[2])
+            num_clause = int(fields[3])
+        except ValueError:
+            return None
+        
+        body = data[end+1:]
+        if not body.endswith(b"\n"):
+            body += b"\n"
+        
+        try:  # literals are validated, but may not fit in 32 bits
+            if np is not None:
+                result = split_clauses(body)
+                if result is None:
+                    return None  # some line does not end with its only 0
+                literals, lengths = result
+                largest = int(np.abs(literals).max(initial=0))
+                seen = np.zeros(largest+1, dtype=np.uint8)
+                seen[np.abs(literals)] = 1
+                literals = array("i", literals.tobytes())
+                lengths = array("b", lengths.astype(np.int8).tobytes())
+                seen = bytearray(seen.tobytes())
+            
+            else:
+                lines = body.split(b"\n")
+                num_lines = len(lines) - lines.count(b"")  # clause lines
+                num_zeros = body.count(b" 0\n") + body.count(b" 0\r\n")
+                del lines
+                tokens = array("i", map(int, body.split()))
+                ends = array("q", compress(count(), map(not_, tokens)))
+                if not len(ends) == num_lines == num_zeros:
+                    return None  # some line does not end with its only 0
+                lengths = array("b", map(sub, ends, [-1, *ends[:-1]]))
+                for i in range(len(lengths)):
+                    lengths[i] -= 1
+                literals = array("i", filter(None, tokens))
+                seen = bytearray(max(map(abs, literals), default=0)+1)
+                for v in map(abs, literals):
+                    seen[v] = 1
+        
+        except (OverflowError, ValueError):
+            return None
+        
+        if len(lengths) and not 1 <= min(lengths) <= max(lengths) <= 2:
+            return None  # empty clause, or too many literals
+        
+        var = list(compress(range(len(seen)), seen))
+        if quiet:
+            return var, literals, lengths
+        
+        if num_var != len(var):
+            print("stated " + str(num_var) + " but gave " + 
+                  str(len(var)) + " variables. missing:")
+            if len(seen) <= num_var:
+                seen.extend(bytes(num_var+1-len(seen)))
+            missing = compress(count(1), map(not_, seen[1:num_var+1]))
+            print_long(" ".join(map(str, missing)), max_lines=1, indent=2)
+        
+        if num_clause != len(lengths):
+            print("stated " + str(num_clause) + " but gave " + 
+                  str(len(lengths)) + " clauses")
+        
+        return var, literals, lengths
+    
+    
+    @staticmethod
+    def simplify(var, clauses):
+        """
+        Simplify a 2-CNF formula before building its implication graph.
+        
+        Repeats until nothing changes:
+          - drop tautologies (a,-a) and duplicate clauses, (a,a) is (a,)
+          - propagate unit clauses
+          - set pure literals, whose negation occurs in no clause, to true
+          - substitute equivalent literals, found as 2-cycles a => b => a,
+            that is the clauses (-a,b) and (a,-b), by one literal
+        
+        Input:  list of variables, list of 1-tuples or 2-tuples
+        Output: My2SATSolver.Simplification (is_unsat is set, and clauses 
+                emptied, if a conflict was found)
+        """
+        result = My2SATSolver.Simplification(var, clauses)
+        fixed = result.fixed
+        
+        def value(literal):  # 1 if true, 0 if false, None if unset
+            v = fixed.get(abs(literal))
+            return v if v is None or literal > 0 else 1-v
+        
+        while True:
+            # substitute, then drop tautologies and duplicates
+            normal = {}
+            for clause in clauses:
+                a, b = result.find(clause[0]), result.find(clause[-1])
+                if a == -b:  # tautology
+                    continue
+                clause = (a,) if a == b else (min(a, b), max(a, b))
+                normal[clause] = None
+            clauses = list(normal)
+            
+            occurrences = {}
+            for c, clause in enumerate(clauses):
+                for literal in clause:
+                    occurrences.setdefault(literal, []).append(c)
+            alive = bytearray(b"\x01") * len(clauses)
+            
+            # unit propagation
+            units = [clause[0] for clause in clauses if len(clause) == 1]
+            while units:
+                literal = units.pop()
+                if value(literal) == 1:
+                    continue
+                if value(literal) == 0:  # conflict
+                    result.clauses = []
+                    result.is_unsat = True
+                    return result
+                fixed[abs(literal)] = 1 if literal > 0 else 0
+                for c in occurrences.get(literal, ()):  # satisfied
+                    alive[c] = 0
+                for c in occurrences.get(-literal, ()):  # shortened
+                    if alive[c]:
+                        alive[c] = 0
+                        units.append(clauses[c][0] + clauses[c][-1] + 
+                                     literal)  # the other literal
+            clauses = list(compress(clauses, alive))
+            
+            # pure literals, whose clauses are removed with them
+            num_occurrences = {}
+            for clause in clauses:
+                for literal in clause:
+                    num_occurrences[literal] = \
+                        num_occurrences.get(literal, 0) + 1
+            occurrences = {}
+            for c, clause in enumerate(clauses):
+                for literal in clause:
+                    occurrences.setdefault(literal, []).append(c)
+            alive = bytearray(b"\x01") * len(clauses)
+            
+            pure = [literal for literal in num_occurrences 
+                    if -literal not in num_occurrences]
+            while pure:
+                literal = pure.pop()
+                if abs(literal) in fixed:
+                    continue
+                fixed[abs(literal)] = 1 if literal > 0 else 0
+                for c in occurrences[literal]:
+                    if not alive[c]:
+                        continue
+                    alive[c] = 0
+                    for other in clauses[c]:
+                        num_occurrences[other] -= 1
+                        if num_occurrences[other] == 0 and \
+                                num_occurrences.get(-other, 0) > 0:
+                            pure.append(-other)
+            clauses = list(compress(clauses, alive))
+            
+            # equivalent literals: (a,b) and (-a,-b) mean a = -b
+            present = set(clauses)
+            found = False
+            for clause in clauses:
+                if len(clause) == 1:
+                    continue
+                a, b = clause
+                if (min(-a, -b), max(-a, -b)) not in present:
+                    continue
+                a, b = result.find(a), result.find(-b)
+                if a == b:
+                    continue
+                if a == -b:  # a = -a, resolved as a conflict next round
+                    found = True
+                    continue
+                if abs(a) < abs(b):  # keep the smaller variable
+                    a, b = b, a
+                result.equivalent[abs(a)] = b if a > 0 else -b
+                found = True
+            
+            if not found:
+                break
+        
+        result.clauses = clauses
+        return result
+    
+    
+    @staticmethod
+    def create_graph(clauses):
+        """
+        Takes in a set of clauses and outputs the adjacency list 
+        of the implication graph which can be formed with the clauses.
+        
+        Input: list of 1-tuples or 2-tuples [(a,), (b,c), ...]
+        Output: dict of int mapped to list of int {a:[b], c:[d,e], ...}
+        """
+        graph = {}
+        
+        for clause in clauses:
+            if len(clause) == 2:
+                a, b = clause
+            else:  # length 1
+                a = b = clause[0]
+            
+            if -a not in graph:  # initialize adjacency list of node
+                graph[-a] = []
+            if b not in graph[-a]:  # prevent duplicate successors
+                graph[-a].append(b)
+            
+            if -b not in graph:
+                graph[-b] = []
+            if a not in graph[-b]:
+                graph[-b].append(a)
+        
+        return graph
+    
+    
+    @staticmethod
+    def create_csr_graph(clauses, num_vars=None, chunk_size=65536):
+        """
+        Takes in a set of clauses and outputs the implication graph in
+        compressed sparse row form, using a few bytes per edge instead of
+        a dict of lists. Duplicate edges are removed by sorting.
+        
+        The clauses are consumed in chunks, so they can come lazily from 
+        a ClauseStream without ever being held in a list.
+        
+        Input:  list OR iterator of 1-tuples or 2-tuples [(a,), (b,c), ...]
+                int (number of variables, defaults to the largest variable)
+        Output: My2SATSolver.ImplicationGraph
+        """
+        sources = array("i")
+        targets = array("i")
+        largest = 0
+        negate = (1).__xor__
+        
+        clauses = iter(clauses)
+        while True:  # consume lazily, chunk_size clauses at a time
+            chunk = list(islice(clauses, chunk_size))
+            if not chunk:
+                break
+            a = [clause[0] for clause in chunk]
+            b = [clause[-1] for clause in chunk]  # a = b for unit clauses
+            largest = max(largest, max(map(abs, a)), max(map(abs, b)))
+            a = list(map(to_node, a))
+            b = list(map(to_node, b))
+            
+            sources.extend(map(negate, a))  # -a => b
+            targets.extend(b)
+            sources.extend(map(negate, b))  # -b => a
+            targets.extend(a)
+        
+        if num_vars is None:
+            num_vars = largest
+        
+        return My2SATSolver.ImplicationGraph.from_edges(num_vars, 
+                                                        sources, targets)
+    
+    
+    @staticmethod
+    def create_csr_graph_bulk(literals, lengths, num_vars=None):
+        """
+        Same as create_csr_graph, but takes the flat clause arrays output by
+        parse_cnf_bulk, and maps all literals to nodes at once with NumPy.
+        
+        Input:  array("i") of literals, array("b") of clause lengths
+                int (number of variables, defaults to the largest variable)
+        Output: My2SATSolver.ImplicationGraph
+        """
+        if np is None:
+            return My2SATSolver.create_csr_graph(
+                iter_clauses(literals, lengths), num_vars)
+        
+        literals = np.frombuffer(literals, dtype=np.int32)
+        lengths = np.frombuffer(lengths, dtype=np.int8)
+        firsts = np.cumsum(lengths, dtype=np.int64) - lengths
+        a = literals[firsts]
+        b = literals[firsts + lengths - 1]  # same as a for unit clauses
+        if num_vars is None:
+            num_vars = int(np.abs(literals).max(initial=0))
+        
+        a = np.where(a > 0, 2*a, 1-2*a).astype(np.int32)  # to_node
+        b = np.where(b > 0, 2*b, 1-2*b).astype(np.int32)
+        sources = np.concatenate((a^1, b^1))  # -a => b, -b => a
+        targets = np.concatenate((b, a))
+        return My2SATSolver.ImplicationGraph.from_edges(num_vars, 
+                                                        sources, targets)
+    
+    
+    @staticmethod
+    def tarjan_scc(graph, profile=None, trace=None):
+        """
+        Tarjan's Algorithm (named for its discoverer, Robert Tarjan) is a 
+        graph theory algorithm for finding the strongly connected components
+        of a graph.
+        
+        Based on: http://www.logarithmic.net/pfh/blog/01208083168
+        
+        The DFS is driven by an explicit stack of (node, successor iterator)
+        frames instead of recursion, so long implication chains do not hit 
+        Python's recursion limit. Nodes are offset into flat arrays, and 
+        on-stack membership is a flag, so the whole pass is O(n+m).
+        
+        Input:  dict of int mapped to list of int {a:[b], c:[d,e], ...}
+                OR My2SATSolver.ImplicationGraph (SCCs are given as literals)
+                Profile (optional, counts the max DFS stack depth)
+                DFSTrace (optional, filled in for certificate)
+        Output: list of tuples of int, one per SCC, in reverse topological order
+                (the root of each SCC, first visited, is last)
+        """
+        if isinstance(graph, My2SATSolver.ImplicationGraph):
+            return [tuple(map(to_literal, scc)) for scc in 
+                    My2SATSolver.tarjan_scc_csr(graph, profile, trace)]
+        
+        if trace is not None:  # nodes are literals
+            parent, low_tail, low_head = trace.start({}, {}, {})
+        
+        # nodes are signed ints, offset them to index into flat arrays
+        offset = 0
+        for node, successors in graph.items():
+            offset = max(offset, abs(node), *map(abs, successors))
+        size = 2*offset + 1
+        
+        # initialize variables
+        index_ctr = 0
+        lowlinks = [0] * size
+        index = [-1] * size  # -1 means unvisited
+        on_stack = bytearray(size)
+        stack = []
+        sccs = []
+        max_depth = 0
+        profiling = bool(profile)  # only then is max_depth kept
+        
+        for root in graph:  # visit all unvisited nodes
+            if index[root+offset] >= 0:
+                continue
+            
+            index[root+offset] = lowlinks[root+offset] = index_ctr
+            index_ctr += 1
+            stack.append(root)
+            on_stack[root+offset] = 1
+            work = [(root, iter(graph.get(root, ())))]
+            
+            while work:
+                node, successors = work[-1]
+                i = node + offset
+                
+                for successor in successors:
+                    j = successor + offset
+                    
+                    # tree edge: descend, lowlinks are updated on the way back
+                    if index[j] < 0:
+                        index[j] = lowlinks[j] = index_ctr
+                        index_ctr += 1
+                        stack.append(successor)
+                        on_stack[j] = 1
+                        work.append((successor, 
+                                     iter(graph.get(successor, ()))))
+                        if profiling and len(work) > max_depth:
+                            max_depth = len(work)
+                        if trace is not None:
+                            parent[successor] = node
+                        break
+                    
+                    # back edge: don't visit, but compare its index with lowlink
+                    elif on_stack[j]:
+                        if index[j] < lowlinks[i]:
+                            lowlinks[i] = index[j]
+                            if trace is not None:
+                                low_tail[node] = node
+                                low_head[node] = successor
+                    
+                    # cross edge: ignore. move on to next successor
+                
+                else:  # all successors explored, return to parent
+                    work.pop()
+                    
+                    # root node to SCC found. pop SCC off stack.
+                    if lowlinks[i] == index[i]:
+                        scc = []
+                        
+                        while True:
+                            successor = stack.pop()
+                            on_stack[successor+offset] = 0
+                            scc.append(successor)
+                            if successor == node: break
+                        
+                        sccs.append(tuple(scc))
+                    
+                    if work:  # propagate lowlink to parent of tree edge
+                        k = work[-1][0] + offset
+                        if lowlinks[i] < lowlinks[k]:
+                            lowlinks[k] = lowlinks[i]
+                            if trace is not None:
+                                low_tail[work[-1][0]] = low_tail[node]
+                                low_head[work[-1][0]] = low_head[node]
+        
+        if profile:
+            profile.count("max_stack_depth", max(max_depth, bool(graph)))
+        return sccs
+    
+    
+    @staticmethod
+    def tarjan_scc_csr(graph, profile=None, trace=None):
+        """
+        Iterative Tarjan's algorithm over a CSR implication graph.
+        
+        Same traversal as tarjan_scc, but the DFS frames only hold a node,
+        and the position of its next unexplored edge is kept in an array.
+        Nodes without successors are never roots, matching the dict graph.
+        Runs as a compiled kernel if Numba is installed, unless tracing.
+        
+        Input:  My2SATSolver.ImplicationGraph
+                Profile (optional, counts the max DFS stack depth)
+                DFSTrace (optional, filled in for certificate)
+        Output: list of lists of nodes, one per SCC, in reverse topological order
+                (the root of each SCC, first visited, is last)
+        """
+        offsets, targets = graph.offsets, graph.targets
+        num_nodes = graph.num_nodes
+        if kernels.JIT and trace is None:
+            order, ends, max_depth = kernels.tarjan_scc_kernel(
+                np.asarray(offsets, dtype=np.int64), 
+                np.asarray(targets, dtype=np.int32), num_nodes)
+            order, ends = order.tolist(), ends.tolist()
+            if profile:
+                profile.count("max_stack_depth", 
+                              max(max_depth, graph.num_edges > 0))
+            with paused_gc():  # millions of lists, none of them cyclic
+                return [order[start:end] 
+                        for start, end in zip([0]+ends, ends)]
+        
+        if trace is not None:
+            parent, low_tail, low_head = trace.start(
+                *(array("i", [-1]) * num_nodes for _ in range(3)), 
+                literal=to_literal, node=to_node)
+        
+        index_ctr = 0
+        lowlinks = array("i", [0]) * num_nodes
+        index = array("i", [-1]) * num_nodes  # -1 means unvisited
+        on_stack = bytearray(num_nodes)
+        next_edge = array("q", offsets)  # next successor to explore
+        stack = []
+        sccs = []
+        max_depth = 0
+        profiling = bool(profile)  # only then is max_depth kept
+        
+        for root in range(num_nodes):
+            if index[root] >= 0 or offsets[root] == offsets[root+1]:
+                continue
+            
+            index[root] = lowlinks[root] = index_ctr
+            index_ctr += 1
+            stack.append(root)
+            on_stack[root] = 1
+            work = [root]
+            
+            while work:
+                node = work[-1]
+                edge, end = next_edge[node], offsets[node+1]
+                
+                while edge < end:
+                    successor = targets[edge]
+                    edge += 1
+                    
+                    if index[successor] < 0:  # tree edge
+                        index[successor] = lowlinks[successor] = index_ctr
+                        index_ctr += 1
+                        stack.append(successor)
+                        on_stack[successor] = 1
+                        work.append(successor)
+                        if profiling and len(work) > max_depth:
+                            max_depth = len(work)
+                        if trace is not None:
+                            parent[successor] = node
+                        break
+                    
+                    elif on_stack[successor]:  # back edge
+                        if index[successor] < lowlinks[node]:
+                            lowlinks[node] = index[successor]
+                            if trace is not None:
+                                low_tail[node] = node
+                                low_head[node] = successor
+                
+                else:  # all successors explored, return to parent
+                    work.pop()
+                    
+                    if lowlinks[node] == index[node]:  # root of an SCC
+                        scc = []
+                        
+                        while True:
+                            successor = stack.pop()
+                            on_stack[successor] = 0
+                            scc.append(successor)
+                            if successor == node: break
+                        
+                        sccs.append(scc)
+                    
+                    if work:
+                        k = work[-1]
+                        if lowlinks[node] < lowlinks[k]:
+                            lowlinks[k] = lowlinks[node]
+                            if trace is not None:
+                                low_tail[k] = low_tail[node]
+                                low_head[k] = low_head[node]
+                    continue
+                
+                next_edge[node] = edge  # resume here when we return
+        
+        if profile:
+            profile.count("max_stack_depth", 
+                          max(max_depth, graph.num_edges > 0))
+        return sccs
+    
+    
+    @staticmethod
+    def tarjan_scc_parallel(graph, num_workers=None, threshold=2**20, 
+                            cutoff=None, seed=0):
+        """
+        SCCs of a CSR implication graph by forward-backward decomposition,
+        on a pool of worker processes sharing the graph arrays.
+        
+        A subproblem is split on a random pivot p: the nodes reachable from
+        p that also reach it are its SCC. The nodes only reachable from p,
+        those only reaching it, and the rest are three subproblems with no
+        edge between them against that order, so they are solved 
+        independently, in parallel. Nodes with no edge in or out are first
+        trimmed off as SCCs of their own, over the whole graph here, then 
+        within each subproblem in the workers. That leaves little of most
+        2-SAT graphs. Subproblems of at most cutoff nodes (by default a 
+        quarter of each worker's share of what is left after trimming) are
+        solved with Tarjan's algorithm instead. Graphs of fewer than 
+        threshold nodes go to tarjan_scc_csr, as do all of them without 
+        NumPy or with a single worker.
+        
+        Input:  My2SATSolver.ImplicationGraph
+                num_workers: number of processes (defaults to the CPU count)
+                seed: seeds the choice of pivots
+        Output: same as tarjan_scc_csr, with the same SCCs, in a reverse 
+                topological order that may be another one
+        """
+        num_workers = num_workers or os.cpu_count() or 1
+        if np is None or graph.num_nodes < threshold or num_workers == 1:
+            return My2SATSolver.tarjan_scc_csr(graph)
+        
+        offsets = np.asarray(graph.offsets, dtype=np.int64)
+        targets = np.asarray(graph.targets, dtype=np.int32)
+        live = np.diff(offsets) > 0
+        live[targets] = True  # isolated nodes are in no SCC, as in Tarjan
+        sinks, sources = trim(offsets, targets, live)
+        nodes = np.flatnonzero(live)
+        if cutoff is None:
+            cutoff = max(len(nodes) // (4*num_workers), 1)
+        
+        # the rest is the root task, between the trimmed nodes
+        segments = [singletons(sinks), ("task", nodes), singletons(sources)]
+        results = {None: segments}  # task number mapped to its segments
+        shared = [share_array(offsets), share_array(targets)] \
+            if len(nodes) else []
+        arrays = [(shm.name, a.dtype.str, len(a)) 
+                  for shm, a in zip(shared, (offsets, targets))]
+        try:
+            with ProcessPoolExecutor(num_workers, initializer=attach_graph,
+                                     initargs=(arrays,)) as pool:
+                pending = {}
+                if len(nodes):
+                    pending[pool.submit(split_scc, nodes, cutoff, seed)] = 0
+                    segments[1] = ("task", 0)
+                num_tasks = 1
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = pending.pop(future)
+                        results[task] = segments = future.result()
+                        for i, (kind, part, *_) in enumerate(segments):
+                            if kind != "task" or not len(part):
+                                continue
+                            pending[pool.submit(split_scc, part, cutoff, 
+                                                seed+num_tasks)] = num_tasks
+                            segments[i] = ("task", num_tasks)
+                            num_tasks += 1
+        finally:
+            for shm in shared:
+                shm.close()
+                shm.unlink()
+        
+        order, ends = [np.zeros(0, dtype=np.int64)], [np.zeros(0, np.int64)]
+        num_order = 0
+        work = [("task", None)]
+        while work:  # replace each task by its segments, in order
+            kind, part, *rest = work.pop()
+            if kind == "task":
+                if not isinstance(part, np.ndarray):  # empty otherwise
+                    work.extend(reversed(results.pop(part)))
+                continue
+            order.append(part)
+            ends.append(rest[0] + num_order)
+            num_order += len(part)
+        
+        order = np.concatenate(order).tolist()
+        ends = np.concatenate(ends).tolist()
+        with paused_gc():  # millions of lists, none of them cyclic
+            return [order[start:end] for start, end in zip([0]+ends, ends)]
+    
+    
+    @staticmethod
+    def backbone(graph, sccs=None, batch_size=8192):
+        """
+        Find the variables that take the same value in every model.
+        
+        A literal x is forced false iff x => -x. Reading an assignment off
+        the SCC order leaves no edge from a true literal to a false one, so
+        only false literals can fail, and x => -x iff x reaches both a and
+        -b for some edge a => b from a false to a true literal. The false 
+        part of the condensation is swept once from the sinks up, carrying
+        a flag for such edges with a = -b, and bitsets of the others, 
+        batch_size of them per sweep. Failing is inherited from successors.
+        
+        Input:  My2SATSolver.ImplicationGraph, and optionally its SCCs
+                from tarjan_scc_csr
+        Output: set of variables forced true, set of variables forced false
+                OR None if the formula is unsatisfiable
+        """
+        if sccs is None:
+            sccs = My2SATSolver.tarjan_scc_csr(graph)
+        offsets, targets = graph.offsets, graph.targets
+        
+        comp = array("i", [-1]) * graph.num_nodes  # -1 for unused variables
+        for i, scc in enumerate(sccs):  # SCCs come sinks first
+            for node in scc:
+                comp[node] = i
+        
+        # node u is false iff its SCC comes before that of u^1
+        is_false = bytearray(len(sccs))
+        for node in range(2, graph.num_nodes):
+            if comp[node] < 0:
+                continue
+            if comp[node] == comp[node^1]:  # literal and negation together
+                return None
+            if comp[node] > comp[node^1]:
+                is_false[comp[node]] = 1
+        
+        # successors of false SCCs that are false, and the SCCs of the false
+        # ends a and -b of false to true edges a => b
+        successors = {}
+        failed = bytearray(len(sccs))
+        pairs = set()
+        for c in compress(range(len(sccs)), is_false):
+            succ = set()
+            for node in sccs[c]:
+                for edge in range(offsets[node], offsets[node+1]):
+                    d = comp[targets[edge]]
+                    if is_false[d]:  # edge stays in the false part
+                        succ.add(d)
+                        continue
+                    b = comp[targets[edge]^1]
+                    if b == c:
+                        failed[c] = 1
+                    else:
+                        pairs.add((min(b, c), max(b, c)))
+            succ.discard(c)
+            successors[c] = succ
+        
+        # only SCCs reaching some a or -b can fail
+        relevant = bytearray(len(sccs))
+        for a, b in pairs:
+            relevant[a] = relevant[b] = 1
+        for c, succ in successors.items():  # sinks first
+            if failed[c] or any(failed[d] for d in succ):
+                failed[c] = 1
+            elif any(relevant[d] for d in succ):
+                relevant[c] = 1
+        relevant = [c for c in successors if relevant[c] and not failed[c]]
+        pairs = list(pairs)
+        
+        for start in range(0, len(pairs), batch_size):
+            left = {}
+            right = {}
+            for bit, (a, b) in enumerate(pairs[start:start+batch_size]):
+                left[a] = left.get(a, 0) | 1 << bit
+                right[b] = right.get(b, 0) | 1 << bit
+            
+            for c in relevant:  # sinks first
+                if failed[c]:
+                    continue
+                l, r = left.get(c, 0), right.get(c, 0)
+                for d in successors[c]:
+                    if failed[d]:  # c => d => -d => -c
+                        failed[c] = 1
+                        break
+                    l |= left.get(d, 0)
+                    r |= right.get(d, 0)
+                if failed[c] or l & r:
+                    failed[c] = 1  # ancestors fail through the flag
+                else:
+                    if l: left[c] = l
+                    if r: right[c] = r
+        
+        # failing is inherited by every false ancestor
+        for c, succ in successors.items():
+            if not failed[c] and any(failed[d] for d in succ):
+                failed[c] = 1
+        
+        forced_true = set()
+        forced_false = set()
+        for node in range(2, graph.num_nodes):
+            if comp[node] >= 0 and failed[comp[node]]:
+                if node & 1:  # -v fails, so v is forced true
+                    forced_true.add(node >> 1)
+                else:
+                    forced_false.add(node >> 1)
+        return forced_true, forced_false
+
+
+class ImplicationIndex:
+    """
+    Reachability index over the condensation of an implication graph, to
+    ask many times whether setting literal a true forces literal b true,
+    that is whether a => b.
+    
+    SCCs come sinks first, so an SCC only reaches SCCs numbered at most
+    its own. If the transitive closure fits in max_closure_bytes, it is 
+    kept as one int bitset per SCC, built in one sweep from the sinks, and
+    a query is a bit test. Otherwise each SCC is labeled with its interval
+    in a DFS spanning forest of the condensation: b inside the subtree of
+    a means yes, b numbered above a means no, and anything else falls 
+    back to a search pruned to the SCCs numbered at least that of b.
+    """
+    def __init__(self, graph, sccs=None, max_closure_bytes=2**27):
+        if sccs is None:
+            sccs = My2SATSolver.tarjan_scc_csr(graph)
+        offsets, targets = graph.offsets, graph.targets
+        self.num_vars = graph.num_vars
+        self.num_sccs = len(sccs)
+        
+        comp = array("i", [-1]) * graph.num_nodes  # -1 for isolated nodes
+        for i, scc in enumerate(sccs):
+            for node in scc:
+                comp[node] = i
+        self.comp = comp
+        
+        # condensation in CSR form, without self loops
+        dag_offsets = array("q", [0])
+        dag_targets = array("i")
+        for i, scc in enumerate(sccs):
+            succ = {comp[targets[edge]] for node in scc 
+                    for edge in range(offsets[node], offsets[node+1])}
+            succ.discard(i)
+            dag_targets.extend(succ)
+            dag_offsets.append(len(dag_targets))
+        self.dag_offsets = dag_offsets
+        self.dag_targets = dag_targets
+        
+        self.closure = None
+        self.low = self.post = None
+        if len(sccs)**2 // 16 <= max_closure_bytes:  # about half are 0 bits
+            closure = []
+            for i in range(len(sccs)):  # sinks first
+                reach = 1 << i
+                for j in dag_targets[dag_offsets[i]:dag_offsets[i+1]]:
+                    reach |= closure[j]
+                closure.append(reach)
+            self.closure = closure
+        else:
+            self._label()
+    
+    @classmethod
+    def from_cnf(cls, cnf, max_closure_bytes=2**27):
+        """Index of a cnf input, parsed with parse_cnf_bulk."""
+        result = My2SATSolver.parse_cnf_bulk(cnf)
+        if not result:  # failed to parse, return None
+            return None
+        var, literals, lengths = result
+        graph = My2SATSolver.create_csr_graph_bulk(literals, lengths, 
+                                                   max(var, default=0))
+        return cls(graph, max_closure_bytes=max_closure_bytes)
+    
+    def implies(self, a, b):
+        """
+        Input:  int, int (literals)
+        Output: bool, True if a => b, so every model with a true has b true
+        """
+        if a == b:
+            return True
+        if not (0 < abs(a) <= self.num_vars and 0 < abs(b) <= self.num_vars):
+            return False  # literals of no clause only imply themselves
+        i, j = self.comp[to_node(a)], self.comp[to_node(b)]
+        if i < 0 or j < 0:  # no successors, or no predecessors
+            return False
+        if i == j:
+            return True
+        if self.closure is not None:
+            return self.closure[i] >> j & 1 == 1
+        return self._search(i, j)
+    
+    def implies_all(self, queries):
+        """
+        Input:  iterable of (a, b) literal pairs
+        Output: list of bool, as from implies
+        """
+        implies = self.implies
+        return [implies(a, b) for a, b in queries]
+    
+    @property
+    def nbytes(self):
+        """Approximate memory used by the index, in bytes."""
+        size = sum(sys.getsizeof(a) for a in 
+                   (self.comp, self.dag_offsets, self.dag_targets))
+        if self.closure is not None:
+            size += sys.getsizeof(self.closure)
+            size += sum(map(sys.getsizeof, self.closure))
+        else:
+            size += sys.getsizeof(self.low) + sys.getsizeof(self.post)
+        return size
+    
+    def _label(self):
+        """Post-order intervals over a DFS spanning forest, sources first."""
+        dag_offsets, dag_targets = self.dag_offsets, self.dag_targets
+        low = array("i", [-1]) * self.num_sccs
+        post = array("i", [-1]) * self.num_sccs
+        next_edge = array("q", dag_offsets)
+        counter = 0
+        for root in reversed(range(self.num_sccs)):
+            if low[root] >= 0:
+                continue
+            low[root] = counter  # lowest post number in the subtree
+            work = [root]
+            while work:
+                c = work[-1]
+                edge, end = next_edge[c], dag_offsets[c+1]
+                while edge < end:
+                    d = dag_targets[edge]
+                    edge += 1
+                    if low[d] < 0:  # tree edge
+                        low[d] = counter
+                        work.append(d)
+                        break
+                else:
+                    work.pop()
+                    post[c] = counter
+                    counter += 1
+                    continue
+                next_edge[c] = edge
+        self.low = low
+        self.post = post
+    
+    def _search(self, i, j):
+        """Whether SCC i reaches SCC j, by a DFS pruned with the labels."""
+        dag_offsets, dag_targets = self.dag_offsets, self.dag_targets
+        low, post = self.low, self.post
+        target = post[j]
+        seen = {i}
+        work = [i]
+        while work:
+            c = work.pop()
+            if low[c] <= target <= post[c]:  # j is in the subtree of c
+                return True
+            for d in dag_targets[dag_offsets[c]:dag_offsets[c+1]]:
+                if d >= j and d not in seen:  # others can't reach j
+                    seen.add(d)
+                    work.append(d)
+        return False
+
+
+class Solver2SAT:
+    """
+    Incremental 2-SAT session.
+    
+    Keeps the implication graph, its SCCs and a topological order of the
+    condensation (Pearce-Kelly), so adding a clause only searches the SCCs
+    whose order lies between the two ends of each new edge, merging them
+    if the edge closes a cycle. push and pop set and roll back checkpoints
+    using a trail of the changes made since.
+    
+    Nodes are numbered as in My2SATSolver.ImplicationGraph.
+    """
+    
+    def __init__(self, clauses=()):
+        """
+        Start a session from base clauses, in one pass of tarjan_scc_csr.
+        
+        Input: list OR iterator of 1-tuples or 2-tuples [(a,), (b,c), ...]
+        """
+        self.num_clauses = 0
+        graph = My2SATSolver.create_csr_graph(self._count(clauses))
+        sccs = My2SATSolver.tarjan_scc_csr(graph)
+        num_nodes = graph.num_nodes
+        
+        self.out = [list(graph.successors(u)) for u in range(num_nodes)]
+        self.inn = [[] for u in range(num_nodes)]
+        for u, successors in enumerate(self.out):
+            for v in successors:
+                self.inn[v].append(u)
+        
+        # each SCC is named by one of its nodes, and ordered so that every
+        # edge between SCCs goes from a lower to a higher order
+        self.comp = list(range(num_nodes))
+        self.order = [0] * num_nodes
+        self.members = [[u] for u in range(num_nodes)]
+        self.conflict = False  # some literal and its negation share an SCC
+        for i, scc in enumerate(sccs):  # in reverse topological order
+            name = scc[0]
+            self.members[name] = scc
+            self.order[name] = len(sccs)-i
+            for u in scc:
+                self.comp[u] = name
+                if self.comp[u^1] == name:
+                    self.conflict = True
+        self.next_order = len(sccs)+1
+        for u in range(num_nodes):  # never visited by tarjan_scc_csr
+            if self.comp[u] == u and self.order[u] == 0:
+                self.order[u] = self.next_order
+                self.next_order += 1
+        
+        self.seen = bytearray(graph.num_vars+1)
+        self.var = []
+        for u in range(2, num_nodes, 2):
+            if self.out[u] or self.inn[u]:
+                self.seen[u >> 1] = 1
+                self.var.append(u >> 1)
+        
+        self.trail = []  # (list, index, old value), index None for appends
+        self.checkpoints = []
+    
+    
+    def add_clause(self, clause):
+        """
+        Add a clause, updating the SCCs and their order incrementally.
+        
+        Input: 1-tuple or 2-tuple (a,) OR (b,c)
+        """
+        a, b = clause[0], clause[-1]  # a = b for unit clauses
+        for literal in (a, b):
+            if abs(literal) >= len(self.seen):
+                self._grow(abs(literal))
+            if not self.seen[abs(literal)]:
+                self.seen[abs(literal)] = 1
+                self.var.append(abs(literal))
+        
+        a, b = to_node(a), to_node(b)
+        self._add_edge(a^1, b)  # -a => b
+        if a != b:
+            self._add_edge(b^1, a)  # -b => a
+        self.num_clauses += 1
+    
+    
+    def add_clauses(self, clauses):
+        for clause in clauses:
+            self.add_clause(clause)
+    
+    
+    def push(self):
+        """Set a checkpoint that pop rolls back to."""
+        self.checkpoints.append((len(self.trail), len(self.comp), 
+                                 len(self.var), self.num_clauses, 
+                                 self.next_order, self.conflict))
+        return len(self.checkpoints)
+    
+    
+    def pop(self):
+        """Undo every clause added since the last checkpoint."""
+        (trail_length, num_nodes, num_vars, self.num_clauses, 
+         self.next_order, self.conflict) = self.checkpoints.pop()
+        
+        trail = self.trail
+        while len(trail) > trail_length:
+            seq, i, old = trail.pop()
+            if i is None:
+                seq.pop()
+            else:
+                seq[i] = old
+        
+        for v in self.var[num_vars:]:
+            self.seen[v] = 0
+        del self.var[num_vars:]
+        del self.seen[num_nodes >> 1:]
+        for seq in (self.comp, self.order, self.members, self.out, self.inn):
+            del seq[num_nodes:]
+        return len(self.checkpoints)
+    
+    
+    @property
+    def is_sat(self):
+        return not self.conflict
+    
+    
+    def solve(self):
+        """
+        Check satisfiability and read off an assignment from the SCC order.
+        A literal is true if its SCC comes after that of its negation.
+        
+        Output: My2SATSolver.TestCase
+        """
+        start_time = time.time()
+        test_case = My2SATSolver.TestCase()
+        test_case.num_vars = len(self.var)
+        test_case.num_clauses = self.num_clauses
+        
+        if self.conflict:
+            test_case.is_sat = "UNSAT"
+        else:
+            comp, order = self.comp, self.order
+            test_case.is_sat = "SAT"
+            test_case.assignments = {
+                v: int(order[comp[2*v]] > order[comp[2*v+1]]) 
+                for v in sorted(self.var)}
+        
+        test_case.time_taken = time.time()-start_time
+        return test_case
+    
+    
+    def _count(self, clauses):
+        for clause in clauses:
+            self.num_clauses += 1
+            yield clause
+    
+    
+    def _grow(self, num_vars):
+        """Add isolated nodes for variables up to num_vars."""
+        for u in range(len(self.comp), 2*(num_vars+1)):
+            self.comp.append(u)
+            self.order.append(self.next_order)
+            self.next_order += 1
+            self.members.append([u])
+            self.out.append([])
+            self.inn.append([])
+        self.seen.extend(bytes(num_vars+1-len(self.seen)))
+    
+    
+    def _set(self, seq, i, value):
+        if self.checkpoints:
+            self.trail.append((seq, i, seq[i]))
+        seq[i] = value
+    
+    
+    def _append(self, seq, value):
+        if self.checkpoints:
+            self.trail.append((seq, None, None))
+        seq.append(value)
+    
+    
+    def _add_edge(self, u, v):
+        self._append(self.out[u], v)
+        self._append(self.inn[v], u)
+        
+        comp, order = self.comp, self.order
+        cu, cv = comp[u], comp[v]
+        lower, upper = order[cv], order[cu]
+        if lower > upper or cu == cv:  # order is still topological
+            return
+        
+        # only SCCs ordered between cv and cu can be affected
+        forward = self._search(cv, self.out, lower, upper)
+        backward = self._search(cu, self.inn, lower, upper)
+        slots = sorted(order[c] for c in forward | backward)
+        
+        if cu in forward:  # the new edge closes a cycle: merge it
+            cycle = forward & backward
+            forward -= cycle
+            backward -= cycle
+            merged = [self._merge(cycle)]
+        else:
+            merged = []
+        
+        # SCCs reaching cu go first, then those reachable from cv
+        backward = sorted(backward, key=order.__getitem__)
+        forward = sorted(forward, key=order.__getitem__)
+        lower_slots = slots[:len(backward)+len(merged)]
+        upper_slots = slots[len(slots)-len(forward):]
+        for c, slot in zip(backward + merged + forward, 
+                           lower_slots + upper_slots):
+            self._set(order, c, slot)
+    
+    
+    def _search(self, start, edges, lower, upper):
+        """SCCs reachable from start along edges, ordered within bounds."""
+        comp, order, members = self.comp, self.order, self.members
+        found = {start}
+        stack = [start]
+        while stack:
+            for u in members[stack.pop()]:
+                for v in edges[u]:
+                    c = comp[v]
+                    if c not in found and lower <= order[c] <= upper:
+                        found.add(c)
+                        stack.append(c)
+        return found
+    
+    
+    def _merge(self, cycle):
+        """Merge the SCCs of a cycle into the largest one and return it."""
+        comp, members = self.comp, self.members
+        name = max(cycle, key=lambda c: len(members[c]))
+        for c in cycle:
+            if c == name:
+                continue
+            for u in members[c]:
+                self._set(comp, u, name)
+                self._append(members[name], u)
+            for u in members[c]:
+                if comp[u^1] == name:
+                    self.conflict = True
+        return name
+
+
+class ParseError(ValueError):
+    """
+    Invalid cnf input, as raised by the quiet API. line is the 1-based 
+    line number of the error, or None if it is not tied to one line.
+    """
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.line = line
+
+
+class Result:
+    """
+    Outcome of My2SATSolver.solve_quiet.
+    
+    num_vars counts the variables given, max_var is the largest one. The
+    model is a bit array, bit v%8 of byte v//8 being set if variable v is
+    true, and is None if the formula is UNSAT.
+    """
+    def __init__(self, is_sat, num_vars, num_clauses, max_var, model=None,
+                 time_taken=None):
+        self.is_sat = is_sat  # bool
+        self.num_vars = num_vars
+        self.num_clauses = num_clauses
+        self.max_var = max_var
+        self.model = model
+        self.time_taken = time_taken
+    
+    def value(self, v):
+        """1 if variable v is true, else 0."""
+        return self.model[v >> 3] >> (v & 7) & 1
+    
+    def to_dict(self):
+        """Model as a dict of every variable up to max_var mapped to 0/1."""
+        return {v:self.value(v) for v in range(1, self.max_var+1)}
+    
+    def write(self, out, per_line=20, chunk_size=2**16):
+        """
+        Stream the answer in the DIMACS solution format: an "s" line, then
+        for SAT the literal of every variable on "v" lines, ending with 0.
+        Written chunk_size variables at a time, so no string of the whole
+        model is built.
+        
+        Input: text or binary file object, OR socket
+        """
+        if hasattr(out, "sendall"):  # socket
+            write = lambda text: out.sendall(text.encode())
+        elif isinstance(out, io.TextIOBase):
+            write = out.write
+        else:
+            write = lambda text: out.write(text.encode())
+        
+        if not self.is_sat:
+            write("s UNSATISFIABLE\n")
+            return
+        write("s SATISFIABLE\n")
+        
+        value = self.value
+        chunk_size -= chunk_size % per_line  # whole lines per chunk
+        for start in range(1, self.max_var+1, chunk_size):
+            stop = min(start+chunk_size, self.max_var+1)
+            literals = [str(v) if value(v) else "-" + str(v) 
+                        for v in range(start, stop)]
+            write("".join("v " + " ".join(literals[i:i+per_line]) + "\n" 
+                          for i in range(0, len(literals), per_line)))
+        write("v 0\n")
+
+
+class Profile:
+    """
+    Wall time per phase and counters of one solve.
+    
+    Phases are timed back to back from the creation of the profile, so
+    their times add up to total. Nothing is measured unless a solve is
+    asked for a profile.
+    
+    Phases of My2SATSolver.solve: parse, graph, scc, check, assign
+    (with stream=True, parsing is part of graph)
+    Counters: num_edges, num_duplicates (compact graph only), num_sccs,
+              largest_scc, max_stack_depth
+    """
+    def __init__(self, hook=None):
+        self.hook = hook  # called as hook(name, value)
+        self.times = {}
+        self.counters = {}
+        self.last_time = time.perf_counter()
+    
+    @property
+    def total(self):
+        return sum(self.times.values())
+    
+    def lap(self, phase):
+        """Time the phase since the previous lap."""
+        now = time.perf_counter()
+        self.times[phase] = now-self.last_time
+        self.last_time = now
+        if self.hook is not None:
+            self.hook(phase, self.times[phase])
+    
+    def count(self, name, value):
+        self.counters[name] = value
+        if self.hook is not None:
+            self.hook(name, value)
+    
+    def __repr__(self):
+        return ("Profile(" + 
+                ", ".join(phase + "=" + format_time(seconds) 
+                          for phase, seconds in self.times.items()) + 
+                ", " + 
+                ", ".join(name + "=" + str(value) 
+                          for name, value in self.counters.items()) + 
+                ")")
+
+
+class InstanceCache:
+    """
+    On-disk cache of parsed and compiled cnf instances, keyed by a hash of
+    the cnf contents.
+    
+    Each instance is one file holding the variables, the flat clause 
+    arrays of parse_cnf_bulk and the CSR implication graph, each section
+    8-byte aligned after a fixed header. Loading maps the file and casts
+    memoryviews over it, so nothing is parsed or copied. Files are in
+    native byte order, so a cache directory is not portable across 
+    machines. Once the directory holds more than max_bytes, the least 
+    recently used files are deleted.
+    """
+    MAGIC = b"2SATBIN1"
+    HEADER = struct.Struct("=8s7q")  # magic, 5 section lengths, 
+                                     # num_vars, num_duplicates
+    SECTIONS = ("i", "i", "b", "q", "i")  # var, literals, lengths, 
+                                          # offsets, targets
+    
+    def __init__(self, directory=None, max_bytes=2**30):
+        if directory is None:
+            directory = os.path.join(os.path.expanduser("~"), ".cache", 
+                                     "solve_2sat")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+    
+    def path(self, key):
+        return os.path.join(self.directory, key + ".bin")
+    
+    def get(self, cnf):
+        """
+        Parsed and compiled instance of a cnf input, loaded from the cache
+        if the same contents were seen before, else parsed and stored.
+        
+        Input:  str (cnf text) OR bytes OR file object (cnf file)
+        Output: variables, literals, lengths (as output by parse_cnf_bulk)
+                and My2SATSolver.ImplicationGraph
+                OR None if parsing failed
+        """
+        data = read_cnf_bytes(cnf)
+        key = hashlib.blake2b(data, digest_size=16).hexdigest()
+        result = self.load(key)
+        if result is not None:
+            self.hits += 1
+            return result
+        
+        self.misses += 1
+        result = My2SATSolver.parse_cnf_bulk(data)
+        if not result:  # failed to parse, return None
+            return None
+        var, literals, lengths = result
+        graph = My2SATSolver.create_csr_graph_bulk(literals, lengths, 
+                                                   max(var, default=0))
+        self.store(key, var, literals, lengths, graph)
+        return var, literals, lengths, graph
+    
+    def load(self, key):
+        """Map a cached instance, or return None if it is not there."""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # missing, or empty
+            return None
+        if len(m) < self.HEADER.size:
+            return None
+        magic, *counts = self.HEADER.unpack_from(m)
+        if magic != self.MAGIC:  # other format version
+            return None
+        
+        view = memoryview(m)
+        sections = []
+        position = self.HEADER.size
+        for typecode, length in zip(self.SECTIONS, counts):
+            size = length * struct.calcsize(typecode)
+            if position+size > len(m):  # truncated
+                return None
+            sections.append(view[position:position+size].cast(typecode))
+            position += size + -size % 8
+        
+        os.utime(path)  # mark as recently used
+        var, literals, lengths, offsets, targets = sections
+        num_vars, num_duplicates = counts[-2:]
+        graph = My2SATSolver.ImplicationGraph(num_vars, offsets, targets, 
+                                              num_duplicates)
+        return var, literals, lengths, graph
+    
+    def store(self, key, var, literals, lengths, graph):
+        """Write an instance, atomically, then evict if over max_bytes."""
+        sections = (array("i", var), literals, lengths, 
+                    graph.offsets, graph.targets)
+        path = self.path(key)
+        temp = path + "." + str(os.getpid()) + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, *map(len, sections), 
+                                     graph.num_vars, graph.num_duplicates))
+            for section in sections:
+                size = memoryview(section).nbytes
+                f.write(section)
+                f.write(bytes(-size % 8))
+        os.replace(temp, path)
+        self.evict()
+    
+    def evict(self):
+        """Delete least recently used files until under max_bytes."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".bin"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            total -= size
+
+
+class ResultCache:
+    """
+    In-memory memo of solve results, keyed on the canonical form of the
+    clause set, so repeated formulas are answered without a graph.
+    
+    Each clause is normalized to a sorted literal pair, (a,) being (a,a),
+    and the pairs are deduplicated, sorted and hashed. Clauses in another
+    order, or repeated, give the same key. An entry keeps the verdict and 
+    the assignment as flat arrays. Once there are more than max_entries
+    entries, or more than max_bytes bytes, the least recently used entries
+    are dropped.
+    """
+    ENTRY_BYTES = 128  # rough overhead of a key and an entry
+    
+    def __init__(self, max_entries=1024, max_bytes=64*2**20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # least recently used first
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def key(clauses):
+        """
+        Input:  list OR iterator of 1-tuples or 2-tuples [(a,), (b,c), ...]
+        Output: bytes (16-byte hash)
+        """
+        pairs = set()
+        for clause in clauses:
+            a, b = clause[0], clause[-1]
+            if a > b:
+                a, b = b, a
+            pairs.add(((a + 2**31) << 32) | (b + 2**31))  # as uint64
+        pairs = array("Q", sorted(pairs))
+        return hashlib.blake2b(pairs.tobytes(), digest_size=16).digest()
+    
+    @staticmethod
+    def key_bulk(literals, lengths):
+        """Same as key, for the flat clause arrays of parse_cnf_bulk."""
+        if np is None:
+            return ResultCache.key(iter_clauses(literals, lengths))
+        
+        literals = np.frombuffer(literals, dtype=np.int32)
+        lengths = np.frombuffer(lengths, dtype=np.int8)
+        firsts = np.cumsum(lengths, dtype=np.int64) - lengths
+        a = literals[firsts]
+        b = literals[firsts + lengths - 1]
+        low = np.minimum(a, b).astype(np.int64) + 2**31
+        high = np.maximum(a, b).astype(np.int64) + 2**31
+        pairs = np.unique((low.astype(np.uint64) << np.uint64(32)) | 
+                          high.astype(np.uint64))
+        return hashlib.blake2b(pairs.tobytes(), digest_size=16).digest()
+    
+    def get(self, key):
+        """
+        Output: (is_sat, assignments) as last put under key
+                OR None if not cached
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        is_sat, variables, values, _ = entry
+        if is_sat == "UNSAT":
+            return is_sat, None
+        return is_sat, dict(zip(variables, values))
+    
+    def put(self, key, is_sat, assignments):
+        if key in self.entries:
+            self.num_bytes -= self.entries.pop(key)[3]
+        if assignments is None:
+            variables, values = array("i"), b""
+        else:
+            variables, values = array("i", assignments), \
+                bytes(assignments.values())
+        size = self.ENTRY_BYTES + len(variables)*4 + len(values)
+        self.entries[key] = (is_sat, variables, values, size)
+        self.num_bytes += size
+        
+        while self.entries and (len(self.entries) > self.max_entries or 
+                                self.num_bytes > self.max_bytes):
+            self.num_bytes -= self.entries.popitem(last=False)[1][3]
+            self.evictions += 1
+    
+    def clear(self):
+        self.entries.clear()
+        self.num_bytes = 0
+    
+    @property
+    def stats(self):
+        return {"hits": self.hits, 
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries), 
+                "bytes": self.num_bytes}
+
+
+class OutOfCore:
+    """
+    Solver for formulas whose implication graph does not fit in memory.
+    
+    The cnf text is read a chunk at a time, and the edges of each chunk
+    are sorted and written to a run file. The runs are merged (an external
+    sort) into the CSR arrays of the graph, in scratch files, and the SCC
+    pass of kernels.tarjan_kernel keeps its per-node arrays in scratch 
+    files too, all memory mapped. Memory otherwise held, by text chunks, 
+    sort buffers and merge blocks, is bounded by about budget bytes. The 
+    mapped pages are backed by the files, so under memory pressure they 
+    are written back and evicted instead of running out. The scratch 
+    files are deleted once solved. Needs NumPy, else solve is solve_quiet.
+    """
+    def __init__(self, directory=None, budget=2**28):
+        self.directory = directory  # parent of the scratch directory
+        self.budget = budget
+        self.scratch = None
+        self.num_files = 0
+    
+    def solve(self, cnf):
+        """
+        Input:  str (path of a .cnf file, which may be compressed) OR 
+                binary file object
+        Output: Result
+        Raises: ParseError if cnf is not a valid 2-SAT problem
+        """
+        if isinstance(cnf, str):
+            with open(cnf, "rb") as f:
+                return self.solve(f)
+        if np is None:
+            return My2SATSolver.solve_quiet(cnf)
+        
+        start_time = time.time()
+        with tempfile.TemporaryDirectory(prefix="2sat-", 
+                                         dir=self.directory) as scratch:
+            self.scratch = scratch
+            graph, num_vars, num_clauses = self.compile(cnf)
+            max_var = graph.num_vars
+            model = self.assign(graph, self.scc(graph))
+            del graph  # unmapped before the files are deleted
+        return Result(model is not None, num_vars, num_clauses, max_var, 
+                      model, time.time()-start_time)
+    
+    def compile(self, f):
+        """
+        Parse a binary cnf stream into a CSR graph in scratch files.
+        
+        Output: My2SATSolver.ImplicationGraph (of mapped NumPy arrays), 
+                number of variables given, number of clauses given
+        """
+        f = decompress_stream(f)
+        line = 0  # lines read so far
+        while True:  # skip the preamble
+            header = f.readline()
+            line += 1
+            if not header.startswith(b"c"):
+                break
+        if header:  # check the problem statement
+            list(My2SATSolver.ClauseStream([header], strict=True, 
+                                           start=line-1))
+        
+        chunk_size = max(2**16, self.budget // 32)
+        runs = []
+        largest = num_clauses = num_edges = 0
+        rest = b""
+        while True:
+            chunk = f.read(chunk_size)
+            body = rest + chunk
+            if chunk:  # whole lines only
+                cut = body.rfind(b"\n") + 1
+                body, rest = body[:cut], body[cut:]
+            elif body and not body.endswith(b"\n"):
+                body += b"\n"
+            
+            if body:
+                literals, lengths = self.clauses(body, line)
+                line += body.count(b"\n")
+                num_clauses += len(lengths)
+                num_edges += 2*len(lengths)
+                largest = max(largest, int(np.abs(literals).max(initial=0)))
+                
+                # -a => b and -b => a, as keys source << 32 | target
+                firsts = np.cumsum(lengths, dtype=np.int64) - lengths
+                a = literals[firsts].astype(np.int64)
+                b = literals[firsts + lengths - 1].astype(np.int64)
+                a = np.where(a > 0, 2*a, 1-2*a).astype(np.uint64)  # to_node
+                b = np.where(b > 0, 2*b, 1-2*b).astype(np.uint64)
+                keys = np.concatenate(((a^1) << 32 | b, (b^1) << 32 | a))
+                runs.append(self.path())
+                np.unique(keys).tofile(runs[-1])  # sorted, no duplicates
+            
+            if not chunk:
+                break
+        
+        offsets = self.array("q", 2*(largest+1) + 1)
+        targets = self.path()
+        with open(targets, "wb") as out:
+            def emit(keys):  # count the degrees, write the targets
+                sources, counts = np.unique(keys >> 32, return_counts=True)
+                offsets[sources.astype(np.int64) + 1] += counts
+                (keys & 0xffffffff).astype(np.int32).tofile(out)
+            
+            self.merge(runs, emit)
+        
+        step = max(2**16, self.budget // 16)
+        total = 0
+        for start in range(0, len(offsets), step):  # degrees to offsets
+            part = offsets[start:start+step]
+            np.cumsum(part, out=part)
+            part += total
+            total = int(part[-1])
+        
+        # variable v is given iff its nodes 2v and 2v+1 have edges
+        evens = offsets[::2]
+        num_vars = 0
+        for start in range(1, len(evens)-1, step):
+            num_vars += np.count_nonzero(np.diff(evens[start:start+step+1]))
+        
+        targets = self.map(targets, "i")
+        graph = My2SATSolver.ImplicationGraph(largest, offsets, targets, 
+                                              num_edges-len(targets))
+        return graph, num_vars, num_clauses
+    
+    def clauses(self, body, line):
+        """
+        Flat clause arrays of whole clause lines, as split_clauses, the 
+        first being line+1. Irregular lines go through ClauseStream.
+        
+        Output: numpy int32 array of literals, array of clause lengths
+        Raises: ParseError
+        """
+        try:
+            result = split_clauses(body)
+        except (OverflowError, ValueError):
+            result = None
+        if result is not None and \
+                (not len(result[1]) or 1 <= result[1].min() <= 
+                 result[1].max() <= 2):
+            return result
+        
+        lines = chain([b"p cnf 0 0"], body.splitlines())
+        clauses = My2SATSolver.ClauseStream(lines, strict=True, 
+                                            start=line-1)
+        try:
+            literals, lengths = flatten_clauses(clauses)
+        except UnicodeDecodeError:
+            raise ParseError("input is not text") from None
+        except OverflowError:
+            raise ParseError("literal out of range") from None
+        return (np.frombuffer(literals, dtype=np.int32), 
+                np.frombuffer(lengths, dtype=np.int8))
+    
+    def merge(self, runs, emit):
+        """
+        Merge sorted runs of keys, calling emit with sorted blocks of them
+        without duplicates. Runs are first merged fan_in at a time into 
+        longer runs, until each can have a block of 2**16 keys in memory.
+        """
+        fan_in = max(2, self.budget // (32 * 2**16))
+        while len(runs) > fan_in:
+            merged = []
+            for i in range(0, len(runs), fan_in):
+                merged.append(self.path())
+                with open(merged[-1], "wb") as out:
+                    self.merge_runs(runs[i:i+fan_in], 
+                                    lambda keys: keys.tofile(out))
+                for run in runs[i:i+fan_in]:
+                    os.remove(run)
+            runs = merged
+        self.merge_runs(runs, emit)
+    
+    def merge_runs(self, runs, emit):
+        block = max(2**10, self.budget // (32 * max(len(runs), 1)))
+        positions = [0] * len(runs)
+        heads = [np.zeros(0, dtype=np.uint64)] * len(runs)
+        live = list(range(len(runs)))
+        last = None
+        
+        while True:
+            for i in list(live):  # refill the heads used up
+                if not len(heads[i]):
+                    heads[i] = np.fromfile(runs[i], dtype=np.uint64, 
+                                           count=block, 
+                                           offset=8*positions[i])
+                    positions[i] += len(heads[i])
+                    if not len(heads[i]):
+                        live.remove(i)
+            if not live:
+                break
+            
+            # no key still on disk is below the smallest last key of a head
+            bound = min(heads[i][-1] for i in live)
+            parts = []
+            for i in live:
+                k = np.searchsorted(heads[i], bound, side="right")
+                parts.append(heads[i][:k])
+                heads[i] = heads[i][k:]
+            keys = np.sort(np.concatenate(parts))
+            keep = np.empty(len(keys), dtype=bool)
+            keep[0] = last is None or keys[0] != last
+            np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+            keys = keys[keep]
+            if len(keys):
+                last = keys[-1]
+                emit(keys)
+    
+    def scc(self, graph):
+        """
+        Number the SCCs of a graph with kernels.tarjan_kernel, over arrays
+        in scratch files.
+        
+        Output: int32 array of the SCC of each node, in reverse topological
+                order, -1 for nodes never visited
+        """
+        num_nodes = graph.num_nodes
+        index = self.array("i", num_nodes)
+        next_edge = self.array("q", num_nodes)
+        step = max(2**16, self.budget // 16)
+        for start in range(0, num_nodes, step):
+            stop = min(start+step, num_nodes)
+            index[start:stop] = -1
+            next_edge[start:stop] = graph.offsets[start:stop]
+        
+        run_kernel(kernels.tarjan_kernel, graph.offsets, graph.targets, 
+                   index, self.array("i", num_nodes), 
+                   self.array("B", num_nodes), next_edge, 
+                   *(self.array("i", num_nodes) for _ in range(4)))
+        return index
+    
+    def assign(self, graph, index):
+        """Same as My2SATSolver.assign_bits, over scc numbers, in chunks."""
+        num_vars = graph.num_vars
+        model = bytearray(num_vars//8 + 1)
+        never = np.iinfo(np.int64).max
+        step = max(2**16, self.budget // 64) // 8 * 8  # whole bytes
+        for start in range(0, num_vars+1, step):
+            stop = min(start+step, num_vars+1)
+            comp = index[2*start:2*stop].astype(np.int64)
+            comp[comp < 0] = never
+            positive, negative = comp[0::2], comp[1::2]
+            if np.any((positive == negative) & (positive < never)):
+                return None
+            bits = np.packbits(positive < negative, bitorder="little")
+            model[start//8:start//8 + len(bits)] = bits.tobytes()
+        return model
+    
+    def path(self):
+        """Path of a new scratch file."""
+        self.num_files += 1
+        return os.path.join(self.scratch, str(self.num_files))
+    
+    def array(self, typecode, length):
+        """Zero-filled array in a new scratch file, memory mapped."""
+        path = self.path()
+        with open(path, "wb") as f:
+            f.truncate(length * np.dtype(typecode).itemsize)  # sparse
+        return self.map(path, typecode)
+    
+    def map(self, path, typecode):
+        with open(path, "r+b") as f:
+            if not os.fstat(f.fileno()).st_size:  # cannot be mapped
+                return np.zeros(0, dtype=typecode)
+            return np.frombuffer(mmap.mmap(f.fileno(), 0), dtype=typecode)
+
+
+def run_kernel(kernel, *args):
+    """
+    Call one of kernels, passing NumPy arrays as memoryviews unless it is
+    compiled, since items of those are faster to get from Python.
+    """
+    if not kernels.JIT:
+        args = [memoryview(a) if isinstance(a, np.ndarray) else a 
+                for a in args]
+    return kernel(*args)
+
+
+def tarjan_arrays(offsets, targets):
+    """
+    SCCs of a CSR graph with kernels.tarjan_kernel.
+    
+    Input:  int64 array of offsets, int32 array of targets
+    Output: int32 arrays of nodes and of where each SCC ends in them, as
+            output by kernels.tarjan_scc_kernel
+    """
+    num_nodes = len(offsets)-1
+    index = np.full(num_nodes, -1, dtype=np.int32)
+    order = np.empty(num_nodes, dtype=np.int32)
+    ends = np.empty(num_nodes, dtype=np.int32)
+    num_order, num_sccs, _ = run_kernel(
+        kernels.tarjan_kernel, offsets, targets, index, 
+        np.zeros(num_nodes, dtype=np.int32), 
+        np.zeros(num_nodes, dtype=np.uint8), offsets[:num_nodes].copy(), 
+        np.empty(num_nodes, dtype=np.int32), 
+        np.empty(num_nodes, dtype=np.int32), order, ends)
+    return order[:num_order], ends[:num_sccs]
+
+
+def reach(offsets, targets, start):
+    """Boolean array of the nodes reachable from start in a CSR graph."""
+    num_nodes = len(offsets)-1
+    seen = np.zeros(num_nodes, dtype=np.uint8)
+    run_kernel(kernels.reach_kernel, offsets, targets, start, seen, 
+               np.empty(num_nodes, dtype=np.int32))
+    return seen.view(bool)
+
+
+def induced_csr(offsets, targets, nodes):
+    """
+    CSR arrays of the subgraph induced by a sorted array of nodes, which
+    are numbered by their position in it.
+    """
+    starts = offsets[nodes]
+    counts = offsets[nodes+1] - starts
+    firsts = np.cumsum(counts) - counts
+    edges = np.repeat(starts - firsts, counts) + np.arange(counts.sum())
+    heads = targets[edges]
+    sources = np.repeat(np.arange(len(nodes)), counts)
+    positions = np.searchsorted(nodes, heads)
+    inside = positions < len(nodes)
+    inside[inside] = nodes[positions[inside]] == heads[inside]
+    local_offsets = np.zeros(len(nodes)+1, dtype=np.int64)
+    np.cumsum(np.bincount(sources[inside], minlength=len(nodes)), 
+              out=local_offsets[1:])
+    return local_offsets, positions[inside].astype(np.int32)
+
+
+def share_array(a):
+    """Copy a NumPy array into a new block of shared memory."""
+    shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+    np.ndarray(len(a), dtype=a.dtype, buffer=shm.buf)[:] = a
+    return shm
+
+
+# graph arrays of tarjan_scc_parallel, in each worker process
+SHARED_GRAPH = []
+
+
+def attach_graph(arrays):
+    """
+    Map the shared graph arrays in a worker of tarjan_scc_parallel.
+    
+    Input:  list of (shared memory name, dtype, length), for the offsets 
+            and the targets
+    """
+    SHARED_GRAPH.clear()
+    for name, dtype, length in arrays:
+        shm = shared_memory.SharedMemory(name)
+        SHARED_GRAPH.append((shm, np.ndarray(length, dtype=dtype, 
+                                             buffer=shm.buf)))
+
+
+def split_scc(nodes, cutoff, seed):
+    """
+    One task of tarjan_scc_parallel, over the subgraph induced by a sorted
+    array of nodes.
+    
+    Nodes with no edge in from or out to the others are trimmed first. If
+    at most cutoff nodes are left, or no cycle through them is possible, 
+    their SCCs are found with Tarjan's algorithm. Else they are split on
+    a random pivot.
+    
+    Output: list of ("sccs", nodes one SCC after the other, where each SCC
+            ends) and ("task", nodes of a subproblem left to solve), in 
+            reverse topological order
+    """
+    (_, offsets), (_, targets) = SHARED_GRAPH
+    offsets, targets = induced_csr(offsets, targets, nodes)
+    live = np.ones(len(nodes), dtype=bool)
+    sinks, sources = trim(offsets, targets, live)
+    rest = np.flatnonzero(live)
+    offsets, targets = induced_csr(offsets, targets, rest)
+    num_nodes = len(rest)
+    pivots = np.flatnonzero((np.diff(offsets) > 0) & 
+                            (np.bincount(targets, minlength=num_nodes) > 0))
+    rest = nodes[rest]
+    
+    if num_nodes <= cutoff or not len(pivots):
+        order, ends = tarjan_arrays(offsets, targets)
+        alone = np.ones(num_nodes, dtype=bool)  # no edge in the subgraph
+        alone[order] = False
+        middle = [singletons(rest[alone]), ("sccs", rest[order], ends)]
+    
+    else:
+        pivot = pivots[np.random.default_rng(seed).integers(len(pivots))]
+        tails = np.repeat(np.arange(num_nodes, dtype=np.int32), 
+                          np.diff(offsets))  # the source of each edge
+        reverse_offsets = np.zeros(num_nodes+1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=num_nodes), 
+                  out=reverse_offsets[1:])
+        reverse_targets = tails[np.argsort(targets, kind="stable")]
+        
+        forward = reach(offsets, targets, int(pivot))
+        backward = reach(reverse_offsets, reverse_targets, int(pivot))
+        scc = rest[forward & backward]
+        middle = [("task", rest[forward & ~backward]), 
+                  ("task", rest[~(forward | backward)]),
+                  ("sccs", scc, np.array([len(scc)])),
+                  ("task", rest[backward & ~forward])]
+    
+    return [singletons(nodes[sinks]), *middle, singletons(nodes[sources])]
+
+
+def singletons(nodes):
+    """Nodes as SCCs of their own, in the format of split_scc."""
+    return "sccs", nodes, np.arange(1, len(nodes)+1)
+
+
+def trim(offsets, targets, live):
+    """
+    Remove the live nodes with no edge in from or out to other live nodes,
+    which are SCCs of their own, round after round, until a round removes
+    less than 1% of them.
+    
+    Input:  CSR arrays, boolean array of the live nodes (updated)
+    Output: array of the nodes removed without edges out, in reverse 
+            topological order, and of the others, which have no edges in,
+            in reverse topological order too, to come after all the rest
+    """
+    num_nodes = len(live)
+    tails = np.repeat(np.arange(num_nodes), np.diff(offsets))  # u of u => v
+    heads = targets
+    sinks, sources = [], []
+    while True:
+        edges = live[tails] & live[heads]
+        tails, heads = tails[edges], heads[edges]
+        sink = live & (np.bincount(tails, minlength=num_nodes) == 0)
+        source = live & (np.bincount(heads, minlength=num_nodes) == 0)
+        source &= ~sink
+        sinks.append(np.flatnonzero(sink))
+        sources.append(np.flatnonzero(source))
+        live &= ~(sink | source)
+        if len(sinks[-1]) + len(sources[-1]) <= np.count_nonzero(live) // 100:
+            break
+    return np.concatenate(sinks), np.concatenate(sources[::-1])
+
+
+def run_parallel(solver, cnf_paths, num_workers=None, timeout=None, 
+                 ordered=False, **options):
+    """
+    Run solver.solve on each .cnf path in a process pool, yielding one
+    TestCase per path as they complete, or in input order if ordered.
+    Pending instances are cancelled if the generator is closed early.
+    """
+    pool = ProcessPoolExecutor(num_workers)
+    try:
+        futures = {pool.submit(solve_path, solver, cnf_path, timeout, 
+                               options): i 
+                   for i, cnf_path in enumerate(cnf_paths)}
+        done = {}
+        next_index = 0
+        for future in as_completed(futures):
+            if not ordered:
+                yield future.result()
+                continue
+            done[futures[future]] = future.result()
+            while next_index in done:  # release the ones now in order
+                yield done.pop(next_index)
+                next_index += 1
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+class _SolveTimeout(Exception):
+    """Raised by the SIGALRM handler of solve_path."""
+
+
+def solve_path(solver, cnf_path, timeout=None, options=None):
+    """
+    Solve one .cnf file quietly, as a worker of run_parallel. The timeout
+    is enforced with SIGALRM where available. A file that can't be read,
+    decoded or solved gives a TestCase with is_sat ERROR, so one bad path
+    doesn't stop the others.
+    """
+    def alarm(signum, frame):
+        raise _SolveTimeout
+    
+    use_alarm = timeout is not None and hasattr(signal, "setitimer")
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start_time = time.time()
+    try:
+        with open_cnf(cnf_path) as f, \
+                contextlib.redirect_stdout(io.StringIO()):
+            test_case = solver.solve(f, **(options or {}))
+        if test_case is None:  # failed to parse
+            test_case = solver.TestCase()
+            test_case.is_sat = "ERROR"
+    except _SolveTimeout:
+        test_case = solver.TestCase()
+        test_case.is_sat = "TIMEOUT"
+        test_case.time_taken = time.time()-start_time
+    except Exception:  # missing, unreadable or undecodable file
+        test_case = solver.TestCase()
+        test_case.is_sat = "ERROR"
+        test_case.time_taken = time.time()-start_time
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    
+    test_case.name = cnf_name_of(cnf_path)
+    return test_case
+
+
+def decompose(clauses):
+    """
+    Split a formula into the connected components of its variable 
+    interaction graph, where two variables are joined if they share a 
+    clause. Uses union-find, by size and with path halving.
+    
+    Input:  list of 1-tuples or 2-tuples [(a,), (b,c), ...]
+    Output: list of (sorted list of variables, list of clauses), one per 
+            component, largest first
+    """
+    parent = {}
+    size = {}
+    
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]  # path halving
+            v = parent[v]
+        return v
+    
+    for clause in clauses:
+        for literal in clause:
+            v = abs(literal)
+            if v not in parent:
+                parent[v] = v
+                size[v] = 1
+        a, b = find(abs(clause[0])), find(abs(clause[-1]))
+        if a != b:
+            if size[a] < size[b]:
+                a, b = b, a
+            parent[b] = a  # join the smaller tree under the larger
+            size[a] += size[b]
+    
+    components = {}
+    for v in sorted(parent):
+        components.setdefault(find(v), ([], []))[0].append(v)
+    for clause in clauses:
+        components[find(abs(clause[0]))][1].append(clause)
+    return sorted(components.values(), key=lambda c: len(c[1]), reverse=True)
+
+
+def run_components(solve_component, components, num_workers=1):
+    """
+    Solve independent components with solve_component(var, clauses), and
+    merge the results (see merge_components).
+    
+    With more than one worker, the components are packed into batches of
+    about equal clause count, a few per worker, and solved on a process 
+    pool. The first component that is not SAT cancels the batches not yet
+    started, and terminates the workers still running.
+    
+    Output: is_sat (SAT, UNSAT or TIMEOUT), dict of variables mapped to 0
+            or 1 sorted by variable (None unless SAT), number of steps (see
+            merge_components)
+    """
+    if num_workers == 1 or len(components) < 2:
+        return merge_components(solve_component(var, clauses) 
+                                for var, clauses in components)
+    
+    num_batches = 4 * (num_workers or os.cpu_count() or 1)
+    batches = [[] for _ in range(min(num_batches, len(components)))]
+    loads = [0] * len(batches)
+    for component in components:  # largest first, into the lightest batch
+        i = loads.index(min(loads))
+        batches[i].append(component)
+        loads[i] += len(component[1])
+    
+    with Pool(num_workers) as pool:  # terminates the workers on exit
+        return merge_components(pool.imap_unordered(
+            partial(solve_batch, solve_component), batches))
+
+
+def merge_components(results):
+    """
+    Merge the results of components, stopping at the first that is not SAT.
+    
+    Input:  iterable of (is_sat, assignments, num_steps), as output by a
+            solve_component: SAT, UNSAT or TIMEOUT, a dict (None unless 
+            SAT), an int (None if the solver doesn't count steps)
+    Output: (is_sat, assignments, num_steps): SAT and all the assignments
+            sorted by variable, or the first other is_sat and None, with
+            the steps of the components solved up to there summed
+    """
+    assignments = {}
+    num_steps = None
+    for is_sat, values, steps in results:
+        if steps is not None:
+            num_steps = (num_steps or 0) + steps
+        if is_sat != "SAT":
+            return is_sat, None, num_steps
+        assignments.update(values)
+    return "SAT", {k:assignments[k] for k in sorted(assignments)}, num_steps
+
+
+def solve_batch(solve_component, batch):
+    """Solve a batch of components in a run_components worker."""
+    return merge_components(solve_component(var, clauses) 
+                            for var, clauses in batch)
+
+
+# leading bytes of each compression format, and the module to open it with
+COMPRESSIONS = ((b"\x1f\x8b", gzip), (b"\xfd7zXZ\x00", lzma), (b"BZh", bz2))
+
+
+def compression_of(data):
+    """Output: module (gzip, lzma or bz2) for the leading bytes, OR None"""
+    for magic, module in COMPRESSIONS:
+        if data.startswith(magic):
+            return module
+    return None
+
+
+def decompress_stream(f):
+    """
+    Wrap a binary stream so that reading it decompresses gzip, xz or bzip2
+    data chunk by chunk, telling the format from the leading bytes.
+    Uncompressed streams are returned as they are. Closing the wrapper 
+    leaves f open.
+    
+    Input:  binary file object (e.g. sys.stdin.buffer)
+    Output: binary file object
+    """
+    head = f.peek(6)[:6] if hasattr(f, "peek") else b""
+    if len(head) < 6 and f.seekable():
+        head = f.read(6)
+        f.seek(-len(head), io.SEEK_CUR)
+    elif len(head) < 6:  # a pipe may have less buffered so far
+        head = b""
+        while len(head) < 6:
+            chunk = f.read(6-len(head))
+            if not chunk:  # end of stream
+                break
+            head += chunk
+        f = io.BufferedReader(PrefixedStream(head, f))
+    module = compression_of(head)
+    if module is None:
+        return f
+    return module.open(f, "rb")
+
+
+class PrefixedStream(io.RawIOBase):
+    """Raw binary stream of the bytes prefix, then of the rest of f."""
+    def __init__(self, prefix, f):
+        self.prefix = prefix
+        self.f = f
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, b):
+        if self.prefix:
+            data, self.prefix = self.prefix[:len(b)], self.prefix[len(b):]
+        elif hasattr(self.f, "read1"):  # don't wait for a full buffer
+            data = self.f.read1(len(b))
+        else:
+            data = self.f.read(len(b)) or b""
+        b[:len(data)] = data
+        return len(data)
+
+
+def open_cnf(cnf_path):
+    """
+    Open a .cnf file for reading as text, decompressing it on the fly if
+    it is gzip, xz or bzip2, whatever its extension. The path "-" stands
+    for the standard input, which may be compressed too.
+    
+    Input:  str (path)
+    Output: text file object, to use as a context manager
+    """
+    if cnf_path == "-":
+        f = decompress_stream(sys.stdin.buffer)
+        if f is sys.stdin.buffer:
+            return contextlib.nullcontext(sys.stdin)
+        return io.TextIOWrapper(f)
+    with open(cnf_path, "rb") as f:
+        module = compression_of(f.read(6))
+    if module is None:
+        return open(cnf_path, "r")
+    return module.open(cnf_path, "rt")
+
+
+def cnf_name_of(cnf_path):
+    return "stdin" if cnf_path == "-" else os.path.basename(cnf_path)
+
+
+def read_cnf_bytes(cnf):
+    """
+    Read a whole cnf input as bytes, memory-mapping real files, and 
+    decompressing gzip, xz or bzip2 data.
+    """
+    if isinstance(cnf, str):
+        return cnf.encode()
+    if isinstance(cnf, (bytes, bytearray)):
+        data = bytes(cnf)
+    else:
+        try:
+            fileno = cnf.fileno()
+            with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as m:
+                data = m[:]  # the raw file, even under a decompressing one
+        except (AttributeError, OSError):  # in-memory file object, or pipe
+            data = cnf.read()
+            if isinstance(data, str):
+                return data.encode()
+        except ValueError:  # empty file cannot be mapped
+            data = b""
+    module = compression_of(data)
+    return data if module is None else module.decompress(data)
+
+
+if np is not None:  # whitespace, b"-" and digits, see parse_ints
+    ALLOWED_BYTES = np.zeros(256, dtype=bool)
+    ALLOWED_BYTES[[9, 10, 13, 32, 45, *range(48, 58)]] = True
+
+
+def parse_ints(data):
+    """
+    Tokenize whitespace-separated decimal integers in one vectorized pass
+    over the raw bytes, instead of calling int() on every token.
+    
+    Input:  bytes
+    Output: numpy int32 array, raises ValueError on any other character
+            and OverflowError on integers that do not fit in 32 bits
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if not ALLOWED_BYTES[buf].all():
+        raise ValueError("unexpected character")
+    digit = (buf >= 48) & (buf <= 57)  # b"0" to b"9"
+    space = buf <= 32  # b"\t", b"\n", b"\r" or b" "
+    
+    # -1 where a token starts, +1 just past where it ends
+    edges = np.diff(np.concatenate(([True], space, [True])).view(np.int8))
+    starts = np.flatnonzero(edges == -1)
+    ends = np.flatnonzero(edges == 1)
+    negative = buf[starts] == 45  # b"-"
+    num_digits = ends - starts - negative
+    num_minus = len(buf) - space.sum() - digit.sum()
+    if (num_digits < 1).any() or negative.sum() != num_minus:
+        raise ValueError("misplaced minus sign")
+    if (num_digits > 10).any():
+        raise OverflowError("integer too large")
+    
+    # each digit adds digit * 10**(places to the end of its token)
+    token = np.repeat(np.arange(len(starts)), num_digits)
+    places = np.flatnonzero(digit)
+    powers = 10.0 ** np.arange(10)
+    weights = (buf[places] - 48) * powers[np.repeat(ends-1, num_digits) - places]
+    values = np.bincount(token, weights=weights, minlength=len(starts))
+    values[negative] *= -1
+    if len(values) and np.abs(values).max() > 2**31 - 1:
+        raise OverflowError("integer too large")
+    return values.astype(np.int32)
+
+
+def split_clauses(body):
+    """
+    Flat clause arrays of clause lines, tokenized with parse_ints.
+    
+    Input:  bytes (whole lines, ending with a newline)
+    Output: numpy int32 array of literals, int64 array of clause lengths
+            OR None if some line does not end with its only 0
+    Raises: ValueError or OverflowError, see parse_ints
+    """
+    newlines = np.flatnonzero(np.frombuffer(body, dtype=np.uint8) == 10)
+    num_lines = np.count_nonzero(np.diff(newlines, prepend=-1) > 1)
+    num_zeros = body.count(b" 0\n") + body.count(b" 0\r\n")
+    tokens = parse_ints(body)
+    ends = np.flatnonzero(tokens == 0)
+    if not len(ends) == num_lines == num_zeros:
+        return None
+    return tokens[tokens != 0], np.diff(ends, prepend=-1) - 1
+
+
+def iter_clauses(literals, lengths):
+    """Yield the clauses of flat clause arrays as 1-tuples or 2-tuples."""
+    i = 0
+    for length in lengths:
+        yield tuple(literals[i:i+length])
+        i += length
+
+
+def flatten_clauses(clauses):
+    """Flat clause arrays, as output by parse_cnf_bulk, of a clause list."""
+    literals = array("i")
+    lengths = array("b")
+    for clause in clauses:
+        literals.extend(clause)
+        lengths.append(len(clause))
+    return literals, lengths
+
+
+def to_bits(assignments, num_vars=None):
+    """Bit array of a dict of assignments, as output by assign_bits."""
+    if num_vars is None:
+        num_vars = max(assignments, default=0)
+    model = bytearray(num_vars//8 + 1)
+    for v, value in assignments.items():
+        if value:
+            model[v >> 3] |= 1 << (v & 7)
+    return model
+
+
+def verify_assignment(literals, lengths, model):
+    """
+    Check an assignment against every clause in one pass, vectorized with
+    NumPy if available. Variables past the end of the model are false.
+    
+    Input:  array("i") of literals, array("b") of clause lengths (1 or 2),
+            as output by parse_cnf_bulk or flatten_clauses
+            bytearray, bit v%8 of byte v//8 set if variable v is true, as
+            output by assign_bits or to_bits
+    Output: list of the indices of the clauses the assignment falsifies
+    """
+    if np is not None:
+        literals = np.frombuffer(literals, dtype=np.int32)
+        lengths = np.frombuffer(lengths, dtype=np.int8)
+        values = np.unpackbits(np.frombuffer(bytes(model), dtype=np.uint8), 
+                               bitorder="little").view(bool)
+        variables = np.abs(literals)
+        largest = int(variables.max(initial=0))
+        if largest >= len(values):
+            values = np.concatenate((values, np.zeros(largest+1-len(values),
+                                                      dtype=bool)))
+        true = values[variables] == (literals > 0)
+        firsts = np.cumsum(lengths, dtype=np.int64) - lengths
+        satisfied = true[firsts] | true[firsts + lengths - 1]
+        return np.flatnonzero(~satisfied).tolist()
+    
+    size = 8*len(model)
+    violated = []
+    i = 0
+    for c, length in enumerate(lengths):
+        for literal in literals[i:i+length]:
+            v = abs(literal)
+            value = model[v >> 3] >> (v & 7) & 1 if v < size else 0
+            if value == (literal > 0):
+                break
+        else:
+            violated.append(c)
+        i += length
+    return violated
+
+
+def to_node(literal):
+    """Map a literal to its CSR node: 2v if positive, 2v+1 if negated."""
+    return 2*literal if literal > 0 else -2*literal+1
+
+
+def to_literal(node):
+    """Map a CSR node back to its literal."""
+    return -(node >> 1) if node & 1 else node >> 1
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """Disable the cyclic garbage collector while allocating in bulk."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def format_time(time_taken):
+    units = ["s", "ms", "μs", "ns", "ps"]
+    i = 0
+    while time_taken < 0.01:
         time_taken *= 1e3
         i += 1
         if i == len(units)-1:
@@ -343,7 +3256,7 @@ def print_long(txt, max_length=50, max_lines=2, dots=2, rlen=10, indent=0):
         last_word = words.pop()
         if len(last_word) > max_length:
             last_word = last_word[-rlen:]
-        while True:
+        while words:
             new_last_word = words.pop() + " " + last_word
             if len(new_last_word) > rlen: 
                 break
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+2D Challenge 50.004: Introduction to Algorithms Sept-Dec 2019 term
+
+2-SAT Solver in Polynomial Time
+
+Portfolio: SCC Solver Racing Random Walkers
+"""
+
+import multiprocessing, queue, random, time
+
+import solve_2sat, solve_random
+from solve_2sat import format_time, print_long
+
+
+class PortfolioSolver:
+    """
+    2-SAT solver racing the SCC solver against seeded random walkers,
+    each in its own process.
+    
+    A SAT answer is taken from whichever engine finds a model first. A
+    random walk only gives up after k*n^2 steps, which is no proof, so an
+    UNSAT answer always comes from the SCC solver.
+    """
+    
+    class TestCase:
+        def __init__(self):
+            self.name = None
+            self.num_vars = None
+            self.num_clauses = None
+            self.is_sat = None
+            self.time_taken = None
+            self.num_steps = None
+            self.assignments = None
+            self.engine = None  # "scc" OR "walk-<seed>"
+    
+    
+    @staticmethod
+    def solve(cnf, num_walkers=2, k=100, timeout=60, seed=None):
+        """
+        Solve a 2-SAT problem with a portfolio of engines.
+        
+        Input: str (cnf text) OR file object (cnf file)
+               num_walkers: number of random walk processes
+               k, timeout: passed on to each random walk
+               seed: seeds of the walkers are seed, seed+1, ...
+                     (random if None)
+        """
+        test_case = PortfolioSolver.TestCase()
+        result = solve_2sat.My2SATSolver.parse_cnf(cnf)
+        if not result:  # failed to parse, return None
+            return None
+        var, clauses = result
+        test_case.num_vars = len(var)
+        test_case.num_clauses = len(clauses)
+        
+        if seed is None:
+            seed = random.randrange(2**32)
+        
+        start_time = time.time()  # start timing here
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(
+            target=PortfolioSolver.scc_worker, args=(clauses, results))]
+        for i in range(num_walkers):
+            workers.append(multiprocessing.Process(
+                target=PortfolioSolver.walk_worker,
+                args=(var, clauses, seed+i, k, timeout, results)))
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        
+        try:  # wait for SAT from anyone, or any answer from the SCC solver
+            while True:
+                try:
+                    message = results.get(timeout=0.1)
+                except queue.Empty:
+                    if any(worker.is_alive() for worker in workers):
+                        continue
+                    try:  # the last answer may have raced the exit
+                        message = results.get_nowait()
+                    except queue.Empty:
+                        raise RuntimeError("all engines exited "
+                                           "without an answer")
+                engine, is_sat, assignments, num_steps = message
+                if is_sat == "SAT" or engine == "scc":
+                    break
+        
+        finally:  # cancel the rest
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+            for worker in workers:
+                worker.join()
+        
+        end_time = time.time()  # stop timing here
+        time_taken = end_time-start_time
+        
+        test_case.is_sat = is_sat
+        test_case.time_taken = time_taken
+        test_case.num_steps = num_steps
+        test_case.assignments = assignments
+        test_case.engine = engine
+        
+        if is_sat == "UNSAT":
+            print("FORMULA UNSATISFIABLE")
+        else:
+            print("FORMULA SATISFIABLE")
+            print_long(" ".join(map(str, assignments.values())))
+        print("solved by " + engine)
+        print("time taken: " + format_time(time_taken))
+        
+        return test_case
+    
+    
+    @staticmethod
+    def scc_worker(clauses, results):
+        graph = solve_2sat.My2SATSolver.create_csr_graph(clauses)
+        sccs = solve_2sat.My2SATSolver.tarjan_scc(graph)
+        assignments = solve_2sat.My2SATSolver.assign(sccs)
+        if assignments is None:
+            results.put(("scc", "UNSAT", None, None))
+        else:
+            results.put(("scc", "SAT", assignments, None))
+    
+    
+    @staticmethod
+    def walk_worker(var, clauses, seed, k, timeout, results):
+        random.seed(seed)
+        result = solve_random.My2SATSolver.random_walk(var, clauses, k,
+                                                       timeout)
+        if result["result"] == "SAT":
+            assignments = {v:result["assignments"][v] for v in sorted(var)}
+        else:  # not a proof, only tells the portfolio to keep waiting
+            assignments = None
+        results.put(("walk-" + str(seed), result["result"], assignments,
+                     result["num_steps"]))
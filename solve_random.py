@@ -13,6 +13,18 @@ Created on Sun Nov 10 18:23:13 2019
 """
 
 import io, time, random
+from array import array
+
+from solve_2sat import Profile, cnf_name_of, decompose, decompress_stream, \
+    flatten_clauses, open_cnf, run_components, run_parallel, to_bits, \
+    verify_assignment
+
+try:  # optional, only used to run many walkers at once
+    import numpy as np
+except ImportError:
+    np = None
+
+import kernels  # compiled inner loops, if Numba is installed
 
 
 class My2SATSolver:
@@ -29,6 +41,8 @@ class My2SATSolver:
             self.time_taken = None
             self.num_steps = None
             self.assignments = None
+            self.profile = None  # Profile, if solved with profile=True
+            self.verified = None  # if SAT and solved with verify
     
     
     @staticmethod
@@ -43,25 +57,40 @@ class My2SATSolver:
     
         
     @staticmethod
-    def solve(cnf):
+    def solve(cnf, walksat=False, num_walkers=None, profile=False, hook=None,
+              verify=False):
         """
         Solve a 2-SAT problem.
         
         Uses strongly-connected components to find satisfiability.
         
         Input: str (cnf text) OR file object (cnf file)
+               walksat: use break-count selection in random_walk
+               num_walkers: run that many walkers with random_walk_batch
+               profile: time the parse and walk phases, and count steps
+                        per second, into test_case.profile
+               hook: called as hook(name, value) with each phase time and
+                     counter as it is measured, implies profile
+               verify: check a SAT assignment against every clause with
+                       verify_assignment, after timing
         """
         test_case = My2SATSolver.TestCase()
+        stats = Profile(hook) if profile or hook else None
         result = My2SATSolver.parse_cnf(cnf)
         if not result:  # failed to parse, return None
             return None
         var, clauses = result
         test_case.num_vars = len(var)
         test_case.num_clauses = len(clauses)
+        if stats:
+            stats.lap("parse")
         
         start_time = time.time()  # start timing here
         
-        result = My2SATSolver.random_walk(var, clauses)
+        if num_walkers:
+            result = My2SATSolver.random_walk_batch(var, clauses, num_walkers)
+        else:
+            result = My2SATSolver.random_walk(var, clauses, walksat=walksat)
         
         end_time = time.time()  # stop timing here
         
@@ -70,6 +99,13 @@ class My2SATSolver:
         time_taken = end_time-start_time
         test_case.time_taken = time_taken
         
+        if stats:
+            stats.lap("walk")
+            stats.count("num_steps", result["num_steps"])
+            stats.count("steps_per_second", 
+                        result["num_steps"] / max(stats.times["walk"], 1e-9))
+            test_case.profile = stats
+        
         if result["result"] in ("UNSAT", "TIMEOUT"):
             print("FORMULA UNSATISFIABLE")
         else:
@@ -86,33 +122,120 @@ class My2SATSolver:
         print_long(" ".join(map(str, assignments.values())))
         print("time taken: " + format_time(time_taken))
         
+        if verify and test_case.is_sat == "SAT":
+            violated = verify_assignment(*flatten_clauses(clauses), 
+                                         to_bits(assignments))
+            test_case.verified = not violated
+            if violated:
+                print("assignment violates " + str(len(violated)) + 
+                      " clauses, first clause " + str(violated[0]+1))
+        
         return test_case
     
     
     @staticmethod
-    def solve_all(*cnf_paths):
+    def solve_all(*cnf_paths, verify=False):
         """
         Solve all provided 2-SAT problems one by one.
         
-        Input: str (any number of .cnf file paths)
+        Input: str (any number of .cnf file paths, which may be gzip, xz
+               or bzip2 compressed, "-" for the standard input)
+               verify: check each assignment, see solve
         """
         My2SATSolver.test_cases.clear()
         for cnf_path in cnf_paths:
-            with open(cnf_path, "r") as f:
-                cnf_name = cnf_path.rsplit("/", 1)[1]
+            with open_cnf(cnf_path) as f:
+                cnf_name = cnf_name_of(cnf_path)
                 print("solving " + cnf_name)
-                test_case = My2SATSolver.solve(f)
+                test_case = My2SATSolver.solve(f, verify=verify)
                 test_case.name = cnf_name
                 My2SATSolver.test_cases.append(test_case)
                 print()
     
     
+    @staticmethod
+    def solve_parallel(*cnf_paths, num_workers=None, timeout=None, 
+                       ordered=False, walksat=False, num_walkers=None):
+        """
+        Solve all provided 2-SAT problems on a pool of worker processes.
+        
+        Unlike solve_all, nothing is printed or stored in test_cases, so it
+        is safe to call from several threads.
+        
+        Input:  str (any number of .cnf file paths)
+                num_workers: number of processes (defaults to the CPU count)
+                timeout: seconds per instance, after which is_sat is TIMEOUT
+                ordered: yield in input order instead of as completed
+        Output: generator of TestCase (is_sat is ERROR if the file could
+                not be read or parsed)
+        """
+        return run_parallel(My2SATSolver, cnf_paths, num_workers, timeout, 
+                            ordered, walksat=walksat, num_walkers=num_walkers)
+    
+    
+    @staticmethod
+    def solve_components(cnf, num_workers=1):
+        """
+        Solve a 2-SAT problem one independent component at a time, so each
+        random walk only gets k*n^2 steps for the n variables it covers.
+        
+        Input: str (cnf text) OR file object (cnf file)
+               num_workers: solve the components on that many processes 
+                            (None for the CPU count, 1 for in-process)
+        """
+        test_case = My2SATSolver.TestCase()
+        result = My2SATSolver.parse_cnf(cnf)
+        if not result:  # failed to parse, return None
+            return None
+        var, clauses = result
+        test_case.num_vars = len(var)
+        test_case.num_clauses = len(clauses)
+        
+        start_time = time.time()  # start timing here
+        components = decompose(clauses)
+        is_sat, assignments, num_steps = run_components(
+            My2SATSolver.solve_component, components, num_workers)
+        end_time = time.time()  # stop timing here
+        time_taken = end_time-start_time
+        test_case.time_taken = time_taken
+        test_case.num_steps = num_steps
+        test_case.is_sat = is_sat
+        
+        if assignments is None:  # some walk gave up (UNSAT or TIMEOUT)
+            print("FORMULA UNSATISFIABLE")
+            assignments = {}
+        else:
+            print("FORMULA SATISFIABLE")
+        test_case.assignments = assignments
+        
+        print_long(" ".join(map(str, assignments.values())))
+        print("time taken: " + format_time(time_taken))
+        
+        return test_case
+    
+    
+    @staticmethod
+    def solve_component(var, clauses):
+        """
+        Random walk on one component, as a worker of run_components.
+        
+        Output: SAT, UNSAT or TIMEOUT, dict of variables mapped to 0 or 1 
+                (None unless SAT), number of steps
+        """
+        result = My2SATSolver.random_walk(var, clauses)
+        assignments = result["assignments"] if result["result"] == "SAT" \
+            else None
+        return result["result"], assignments, result["num_steps"]
+    
+    
     @staticmethod
     def parse_cnf(cnf):
         """
         Takes in cnf file and outputs its set of clauses.
         
-        Input:  str (cnf text) OR file object (cnf file)
+        Input:  str (cnf text) OR file object (cnf file, text or binary,
+                binary ones may be gzip, xz or bzip2 compressed)
+                OR any iterator of lines (str)
         Output: list of 1-tuples or 2-tuples [(a,), (b,c), ...]
         """
         num_var = 0
@@ -121,12 +244,15 @@ class My2SATSolver:
         fmt = None
         clauses = []
         
-        if isinstance(cnf, io.TextIOBase):
-            lines = cnf
-        
-        elif isinstance(cnf, str):
+        if isinstance(cnf, str):
             lines = cnf.splitlines()
         
+        elif isinstance(cnf, (io.BufferedIOBase, io.RawIOBase)):
+            lines = (line.decode() for line in decompress_stream(cnf))
+        
+        else:
+            lines = cnf
+        
         for i, line in enumerate(lines):        
             if fmt != "cnf":
                 if line.startswith("c"):  # preamble
@@ -190,6 +316,9 @@ class My2SATSolver:
                             print("invalid literal at line " + str(i+1) + ": " +
                                   str(b[0]) + ", expected an integer")
                             return None
+                        if abs(b[i]) >= 2**31:  # packed as 32 bits
+                            print("literal out of range: " + str(b[i]))
+                            return None
                         if abs(b[i]) not in var:
                             var.append(abs(b[i]))
                     if len(b) == 1:
@@ -212,58 +341,275 @@ class My2SATSolver:
 
     
     @staticmethod
-    def random_walk(var, clauses, k=100, timeout=60):
-        assignments = dict.fromkeys(var, 0)
+    def random_walk(var, clauses, k=100, timeout=60, walksat=False, noise=0.5):
+        """
+        Random walk on assignments: while some clause is unsatisfied, flip
+        one of its literals, for at most k*n^2 steps.
+        
+        Keeps the clauses each variable occurs in, the number of true
+        literals per clause and an indexed set of unsatisfied clauses, so
+        each step only costs the degree of the flipped variable.
+        
+        Input:  list of variables, list of 1-tuples or 2-tuples
+                walksat: flip the literal that breaks the fewest satisfied
+                         clauses, or a random one with probability noise,
+                         instead of a uniform 50/50 choice
+        Output: dict with num_steps, assignments and result
+                (SAT, UNSAT or TIMEOUT)
+        """
+        if kernels.JIT:
+            return My2SATSolver.random_walk_jit(var, clauses, k, timeout, 
+                                                walksat, noise)
+        
+        clauses = normalize_clauses(clauses)
+        size = max(var, default=0)+1
+        value = bytearray(size)  # all variables start at 0
         
-        def calculate_truth(clause):
+        # occurrences[v] holds (clause, literal) for each literal of v
+        occurrences = [[] for v in range(size)]
+        num_true = array("b", bytes(len(clauses)))
+        for c, clause in enumerate(clauses):
             for literal in clause:
-                if literal > 0:
-                    if assignments[literal] == 1:
-                        return 1
-                elif assignments[-literal] == 0:
-                    return 1
-            return 0
+                occurrences[abs(literal)].append((c, literal))
+                if literal < 0:
+                    num_true[c] += 1
         
-        def flip(literal):
-            assignments[abs(literal)] = 1-assignments[abs(literal)]
+        # unsatisfied clauses, and their position in that list (or -1)
+        unsat = [c for c in range(len(clauses)) if num_true[c] == 0]
+        position = array("q", [-1]) * len(clauses)
+        for i, c in enumerate(unsat):
+            position[c] = i
         
-        num_var = len(var)
+        def breaks(v):  # satisfied clauses which only v satisfies
+            num_breaks = 0
+            for c, literal in occurrences[v]:
+                if num_true[c] == 1 and (literal > 0) == value[v]:
+                    num_breaks += 1
+            return num_breaks
+        
+        def flip(v):
+            value[v] ^= 1
+            for c, literal in occurrences[v]:
+                if (literal > 0) == value[v]:  # literal became true
+                    num_true[c] += 1
+                    if num_true[c] == 1:  # remove c from unsat
+                        last = unsat.pop()
+                        if last != c:
+                            unsat[position[c]] = last
+                            position[last] = position[c]
+                        position[c] = -1
+                else:  # literal became false
+                    num_true[c] -= 1
+                    if num_true[c] == 0:  # add c to unsat
+                        position[c] = len(unsat)
+                        unsat.append(c)
+        
+        max_steps = k*len(var)**2
+        num_steps = 0
         is_timeout = False
         start_time = time.time()
-        for num_steps in range(k*num_var**2):
-            if time.time()-start_time > timeout:  # check for timeout
-                is_timeout = True
+        while unsat and num_steps < max_steps:
+            if num_steps % 1024 == 0 and time.time()-start_time > timeout:
+                is_timeout = True  # check for timeout
                 break
-            is_unsat = False  # reset flag
-            for clause in clauses:  # find a bad clause
-                if calculate_truth(clause) == 0:
-                    is_unsat = True
-                    bad_clause = clause
-                    break
-            if is_unsat:  # choose a random literal
-                if len(bad_clause) == 1:
-                    literal = bad_clause[0]
-                elif random.random() > 0.5:
-                    literal = bad_clause[0]
+            num_steps += 1
+            bad_clause = clauses[random.choice(unsat)]  # find a bad clause
+            
+            if walksat:  # choose the literal that breaks the least
+                candidates = [abs(literal) for literal in bad_clause]
+                scores = [breaks(v) for v in candidates]
+                if min(scores) > 0 and random.random() < noise:
+                    v = random.choice(candidates)
                 else:
-                    literal = bad_clause[1]
-                flip(literal)  # and flip it
+                    v = candidates[scores.index(min(scores))]
+            
+            elif len(bad_clause) == 1:  # choose a random literal
+                v = abs(bad_clause[0])
+            elif random.random() > 0.5:
+                v = abs(bad_clause[0])
+            else:
+                v = abs(bad_clause[1])
+            flip(v)  # and flip it
+        
+        result = {"num_steps":num_steps+1}
+        if not unsat:
+            result["assignments"] = {v:value[v] for v in var}
+            result["result"] = "SAT"
+        else:
+            result["assignments"] = {}
+            if is_timeout:
+                result["result"] = "TIMEOUT"
             else:
+                result["result"] = "UNSAT"
+        return result
+    
+    
+    @staticmethod
+    def random_walk_jit(var, clauses, k=100, timeout=60, walksat=False, 
+                        noise=0.5, chunk_size=2**20):
+        """
+        random_walk as a compiled kernel (see kernels.walk_kernel) over 
+        arrays instead of lists, run chunk_size steps at a time so that the
+        timeout is checked in between. The kernel is seeded from random.
+        
+        Input:  list of variables, list of 1-tuples or 2-tuples
+        Output: dict with num_steps, assignments and result
+                (SAT, UNSAT or TIMEOUT)
+        """
+        size = max(var, default=0)+1
+        flat, lengths = flatten_clauses(normalize_clauses(clauses))
+        flat = np.asarray(flat, dtype=np.int32)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        num_clauses = len(lengths)
+        clause = np.repeat(np.arange(num_clauses, dtype=np.int32), lengths)
+        
+        # 2 literals per clause, the second 0 for units
+        literals = np.zeros(2*num_clauses, dtype=np.int32)
+        starts = np.cumsum(lengths)-lengths
+        literals[::2] = flat[starts]
+        pairs = lengths == 2
+        literals[1::2][pairs] = flat[starts[pairs]+1]
+        
+        # occurrences of each variable, in clause order
+        variables = np.abs(flat)
+        by_variable = np.argsort(variables, kind="stable")
+        occ_offsets = np.zeros(size+1, dtype=np.int64)
+        np.cumsum(np.bincount(variables, minlength=size), out=occ_offsets[1:])
+        occ_clauses = clause[by_variable]
+        occ_literals = flat[by_variable]
+        
+        value = np.zeros(size, dtype=np.uint8)  # all variables start at 0
+        num_true = np.bincount(clause, weights=flat < 0, 
+                               minlength=num_clauses).astype(np.int8)
+        unsat = np.zeros(num_clauses, dtype=np.int32)
+        bad = np.flatnonzero(num_true == 0)
+        unsat[:len(bad)] = bad
+        position = np.full(num_clauses, -1, dtype=np.int64)
+        position[bad] = np.arange(len(bad))
+        num_unsat = np.array([len(bad)], dtype=np.int64)
+        
+        kernels.seed_kernel(random.getrandbits(32))
+        max_steps = k*len(var)**2
+        num_steps = 0
+        is_timeout = False
+        start_time = time.time()
+        while num_unsat[0] and num_steps < max_steps:
+            if time.time()-start_time > timeout:
+                is_timeout = True
                 break
+            num_steps += kernels.walk_kernel(
+                literals, occ_offsets, occ_clauses, occ_literals, value, 
+                num_true, unsat, position, num_unsat, 
+                min(chunk_size, max_steps-num_steps), walksat, noise)
         
         result = {"num_steps":num_steps+1}
-        if not is_unsat:
-            result["assignments"] = assignments
+        if not num_unsat[0]:
+            value = value.tolist()
+            result["assignments"] = {v:value[v] for v in var}
+            result["result"] = "SAT"
+        else:
+            result["assignments"] = {}
+            if is_timeout:
+                result["result"] = "TIMEOUT"
+            else:
+                result["result"] = "UNSAT"
+        return result
+    
+    
+    @staticmethod
+    def random_walk_batch(var, clauses, num_walkers=256, k=100, timeout=60,
+                          seed=None):
+        """
+        Run num_walkers independent random walks at once with NumPy.
+        
+        The walkers are rows of a boolean (walkers x variables) matrix. 
+        Each step evaluates every clause for every walker with gathers 
+        over a clause-literal array, then each walker with a bad clause 
+        flips a random literal of a random one. Stops at the first walker
+        that reaches a model. Falls back to random_walk without NumPy.
+        
+        Input:  list of variables, list of 1-tuples or 2-tuples
+        Output: dict with num_steps (of the winning walker), walker, 
+                assignments and result (SAT, UNSAT or TIMEOUT)
+        """
+        if np is None:
+            result = My2SATSolver.random_walk(var, clauses, k, timeout)
+            result["walker"] = 0
+            return result
+        
+        rng = np.random.default_rng(seed)
+        column = np.zeros(max(var, default=0)+1, dtype=np.int64)
+        column[var] = np.arange(len(var))
+        
+        # clause-literal array, unit clauses repeat their literal
+        literals = np.array([(clause[0], clause[-1]) for clause in clauses],
+                            dtype=np.int64).reshape(-1, 2)
+        columns = column[np.abs(literals)]
+        positive = literals > 0
+        
+        values = np.zeros((num_walkers, len(var)), dtype=bool)
+        walkers = np.arange(num_walkers)
+        max_steps = k*len(var)**2
+        num_steps = 0
+        winner = None
+        is_timeout = False
+        start_time = time.time()
+        while True:
+            bad = ((values[:, columns[:, 0]] != positive[:, 0]) & 
+                   (values[:, columns[:, 1]] != positive[:, 1]))
+            walker, bad_clauses = np.nonzero(bad)  # grouped by walker
+            num_bad = np.bincount(walker, minlength=num_walkers)
+            if not num_bad.all():
+                winner = int(np.argmin(num_bad))
+                break
+            if num_steps >= max_steps:
+                break
+            if time.time()-start_time > timeout:  # check for timeout
+                is_timeout = True
+                break
+            num_steps += 1
+            
+            # a random bad clause per walker, then one of its literals
+            first = np.cumsum(num_bad) - num_bad
+            rank = (rng.random(num_walkers) * num_bad).astype(np.int64)
+            bad_clause = bad_clauses[first + rank]
+            side = (rng.random(num_walkers) > 0.5).astype(np.int64)
+            values[walkers, columns[bad_clause, side]] ^= True
+        
+        result = {"num_steps":num_steps+1, "walker":winner}
+        if winner is not None:
+            result["assignments"] = dict(zip(var, 
+                                             values[winner].astype(int).tolist()))
             result["result"] = "SAT"
         else:
             result["assignments"] = {}
             if is_timeout:
                 result["result"] = "TIMEOUT"
-            elif is_unsat:
+            else:
                 result["result"] = "UNSAT"
         return result
 
 
+def normalize_clauses(clauses):
+    """
+    Drop tautologies (x,-x) and shorten (x,x) to (x,), so that no clause 
+    has two literals of the same variable. The random walks count the true
+    literals of each clause, which such clauses would throw off: (x,x) 
+    would count x twice, and (x,-x) would seem broken by flipping x.
+    
+    Input:  list of 1-tuples or 2-tuples
+    Output: list of 1-tuples or 2-tuples
+    """
+    normal = []
+    for clause in clauses:
+        if len(clause) == 2 and abs(clause[0]) == abs(clause[1]):
+            if clause[0] != clause[1]:  # always true
+                continue
+            clause = clause[:1]
+        normal.append(clause)
+    return normal
+
+
 def format_time(time_taken):
     units = ["s", "ms", "μs", "ns", "ps"]
     i = 0
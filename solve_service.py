@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+2D Challenge 50.004: Introduction to Algorithms Sept-Dec 2019 term
+
+2-SAT Solver in Polynomial Time
+
+Service: Long-Running asyncio Solve Server and Benchmark Client
+
+Usage:
+    python solve_service.py serve --unix /tmp/2sat.sock --load big=big.cnf
+    python solve_service.py bench --unix /tmp/2sat.sock --named big
+    python solve_service.py bench --port 8765 --cnf test/2sat-4-5.cnf
+
+Protocol, over a Unix or TCP socket, any number of requests per connection:
+    request:  "SOLVE <n>\\n" followed by n bytes of DIMACS cnf text
+              OR "NAMED <name>\\n" for an instance loaded by the server
+    response: "<status> <n>\\n" followed by n bytes, where status is OK and
+              the body is the answer in DIMACS solution format (s and v
+              lines, see Result.write), or ERROR and the body a message
+"""
+
+import argparse, asyncio, io, os, statistics, time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+
+from solve_2sat import My2SATSolver, ParseError, Result, format_time
+
+
+class SolveService:
+    """
+    asyncio server handing solves to a pool of worker processes.
+    
+    Requests of at most small_size bytes are batched: they wait up to
+    batch_delay seconds for others, and go to a worker batch_size at a
+    time. Named instances are compiled once, before the pool starts, so 
+    forked workers share their graphs (workers that are spawned instead 
+    compile their own), and they stay resident there. At most max_pending
+    requests are in flight. Past that, connections are not read any
+    further, so clients are slowed down by the socket buffers. Bodies of
+    more than max_size bytes are refused unread. If a worker dies, the
+    requests the pool held are answered with an error, and a new pool
+    takes its place.
+    """
+    def __init__(self, instances=None, num_workers=None, batch_size=32,
+                 batch_delay=0.002, small_size=2**16, max_pending=256,
+                 max_size=2**28):
+        self.instances = dict(instances or {})  # name mapped to .cnf path
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.small_size = small_size
+        self.max_pending = max_pending
+        self.max_size = max_size
+        self.pool = None
+        self.pending = None
+        self.batch = []  # (cnf bytes, future) waiting to be sent
+        self.flush_handle = None
+    
+    async def start(self, path=None, host="127.0.0.1", port=8765):
+        """
+        Compile the named instances and start the worker pool, then listen
+        on path if given, else on port.
+        """
+        load_instances(self.instances)
+        num_workers = self.num_workers or os.cpu_count() or 1
+        self.pool = self.new_pool()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, os.getpid)
+                               for _ in range(num_workers)))
+        self.pending = asyncio.Semaphore(self.max_pending)
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+    
+    def new_pool(self):
+        return ProcessPoolExecutor(self.num_workers or os.cpu_count() or 1,
+                                   initializer=load_instances,
+                                   initargs=(self.instances,))
+    
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+    
+    async def run(self, func, *args):
+        """
+        Run func(*args) in the pool. If the pool is broken, by a worker
+        that died, replace it and raise BrokenExecutor.
+        """
+        pool = self.pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, func, *args)
+        except BrokenExecutor:
+            if self.pool is pool:  # not replaced by another request yet
+                pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = self.new_pool()
+            raise
+    
+    async def handle(self, reader, writer):
+        """Answer the requests of one connection, in order."""
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                async with self.pending:
+                    status, body, lost = await self.request(header, reader)
+                writer.write(status + b" " + str(len(body)).encode() +
+                             b"\n" + body)
+                await writer.drain()
+                if lost:  # can't find where the next request starts
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def request(self, header, reader):
+        """
+        Read the rest of a request and answer it.
+        
+        Output: (status, body, lost), lost being True if the request could
+                not be read whole, so the connection is out of step
+        """
+        fields = header.split()
+        if len(fields) == 2 and fields[0] == b"SOLVE":
+            try:
+                size = int(fields[1])
+            except ValueError:
+                return b"ERROR", b"invalid size " + fields[1], True
+            if not 0 <= size <= self.max_size:
+                return b"ERROR", b"size out of range " + fields[1], True
+            data = await reader.readexactly(size)
+            try:
+                if size <= self.small_size:
+                    return (*await self.batched(data), False)
+                return (*await self.run(solve_request, data), False)
+            except (BrokenExecutor, RuntimeError) as e:  # or shut down
+                return b"ERROR", error_message(e), False
+        
+        if len(fields) == 2 and fields[0] == b"NAMED":
+            try:
+                return (*await self.run(solve_named, fields[1].decode()),
+                        False)
+            except (BrokenExecutor, RuntimeError) as e:
+                return b"ERROR", error_message(e), False
+        
+        return b"ERROR", b"invalid request " + header.strip(), True
+    
+    async def batched(self, data):
+        """Queue a small request for the next batch, and wait for it."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.batch.append((data, future))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.batch_delay, self.flush)
+        return await future
+    
+    def flush(self):
+        """Send the queued requests to a worker as one batch."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+        
+        def done(task):
+            if task.cancelled():  # the pool was shut down
+                for _, future in batch:
+                    future.cancel()
+                return
+            if task.exception() is not None:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(task.exception())
+                return
+            for (_, future), response in zip(batch, task.result()):
+                if not future.done():  # unless the client went away
+                    future.set_result(response)
+        
+        task = asyncio.ensure_future(
+            self.run(solve_requests, [data for data, _ in batch]))
+        task.add_done_callback(done)
+
+
+# state of each worker process, see load_instances
+INSTANCES = {}  # name mapped to .cnf path
+GRAPHS = {}  # name mapped to (graph, number of variables, of clauses)
+
+
+def load_instances(instances):
+    """Compile the named instances not inherited from the server already."""
+    INSTANCES.update(instances)
+    for name, path in instances.items():
+        if name in GRAPHS:
+            continue
+        with open(path, "rb") as f:
+            GRAPHS[name] = My2SATSolver.compile_quiet(f)
+
+
+def solve_request(data):
+    """
+    Solve cnf bytes in a worker, output (status, body). Any error is 
+    answered as such, so that it stays with its own request.
+    """
+    try:
+        return b"OK", write_result(My2SATSolver.solve_quiet(data))
+    except ParseError as e:
+        line = "" if e.line is None else "line " + str(e.line) + ": "
+        return b"ERROR", (line + str(e)).encode()
+    except Exception as e:  # e.g. MemoryError, not the whole batch's
+        return b"ERROR", error_message(e)
+
+
+def solve_requests(batch):
+    return [solve_request(data) for data in batch]
+
+
+def solve_named(name):
+    """Solve a named instance in a worker, from its resident graph."""
+    if name not in GRAPHS:
+        return b"ERROR", b"unknown instance " + name.encode()
+    start_time = time.time()
+    graph, num_vars, num_clauses = GRAPHS[name]
+    try:
+        model = My2SATSolver.assign_bits(graph,
+                                         My2SATSolver.tarjan_scc_csr(graph))
+    except Exception as e:
+        return b"ERROR", error_message(e)
+    result = Result(model is not None, num_vars, num_clauses,
+                    graph.num_vars, model, time.time()-start_time)
+    return b"OK", write_result(result)
+
+
+def error_message(e):
+    return ("internal error: " + type(e).__name__ + " " + str(e)).encode()
+
+
+def write_result(result):
+    out = io.BytesIO()
+    result.write(out)
+    return out.getvalue()
+
+
+async def read_response(reader):
+    """Output: (status, body) of the next response on a connection."""
+    header = await reader.readline()
+    if not header:
+        raise ConnectionError("connection closed by the server")
+    status, size = header.split()
+    return status.decode(), await reader.readexactly(int(size))
+
+
+async def bench(connect, request, num_requests=1000, concurrency=16):
+    """
+    Send the same request num_requests times over concurrency connections,
+    each waiting for its answer before sending the next.
+    
+    Input:  coroutine function opening a connection, as (reader, writer)
+            bytes of a whole request
+    Output: dict of latency percentiles (seconds), throughput (requests
+            per second) and the number of errors
+    """
+    latencies = []
+    errors = 0
+    
+    async def client(n):
+        nonlocal errors
+        reader, writer = await connect()
+        try:
+            for _ in range(n):
+                start_time = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                status, _ = await read_response(reader)
+                latencies.append(time.perf_counter()-start_time)
+                errors += status != "OK"
+        finally:
+            writer.close()
+    
+    shares = [num_requests // concurrency + (i < num_requests % concurrency)
+              for i in range(concurrency)]
+    start_time = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in shares if n))
+    time_taken = time.perf_counter()-start_time
+    
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) \
+        if len(latencies) > 1 else latencies * 99
+    return {"p50": quantiles[49],
+            "p99": quantiles[98],
+            "throughput": len(latencies) / time_taken,
+            "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[2])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "bench"):
+        command = commands.add_parser(name)
+        command.add_argument("--unix", help="socket path, instead of TCP")
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=8765)
+    
+    serve_parser = commands.choices["serve"]
+    serve_parser.add_argument("--load", nargs="*", default=[],
+                              metavar="NAME=PATH",
+                              help="instances to keep compiled")
+    serve_parser.add_argument("--workers", type=int)
+    serve_parser.add_argument("--batch-size", type=int, default=32)
+    serve_parser.add_argument("--batch-delay", type=float, default=0.002)
+    serve_parser.add_argument("--max-pending", type=int, default=256)
+    serve_parser.add_argument("--max-size", type=int, default=2**28,
+                              help="largest cnf body accepted, in bytes")
+    
+    bench_parser = commands.choices["bench"]
+    request = bench_parser.add_mutually_exclusive_group(required=True)
+    request.add_argument("--cnf", help=".cnf file to send")
+    request.add_argument("--named", help="instance loaded by the server")
+    bench_parser.add_argument("--requests", type=int, default=1000)
+    bench_parser.add_argument("--concurrency", type=int, default=16)
+    
+    args = parser.parse_args()
+    if args.command == "serve":
+        instances = dict(item.split("=", 1) for item in args.load)
+        service = SolveService(instances, args.workers, args.batch_size,
+                               args.batch_delay,
+                               max_pending=args.max_pending,
+                               max_size=args.max_size)
+        
+        async def serve():
+            server = await service.start(args.unix, args.host, args.port)
+            print("serving on " + (args.unix or args.host + ":" +
+                                   str(args.port)))
+            async with server:
+                await server.serve_forever()
+        
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            service.close()
+        return 0
+    
+    if args.cnf:
+        with open(args.cnf, "rb") as f:
+            data = f.read()
+        request = b"SOLVE " + str(len(data)).encode() + b"\n" + data
+    else:
+        request = b"NAMED " + args.named.encode() + b"\n"
+    
+    if args.unix:
+        connect = lambda: asyncio.open_unix_connection(args.unix)
+    else:
+        connect = lambda: asyncio.open_connection(args.host, args.port)
+    
+    stats = asyncio.run(bench(connect, request, args.requests,
+                              args.concurrency))
+    print("p50: " + format_time(stats["p50"]))
+    print("p99: " + format_time(stats["p99"]))
+    print("throughput: %.1f requests/s" % stats["throughput"])
+    print("errors: " + str(stats["errors"]))
+    return 1 if stats["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
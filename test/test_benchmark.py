@@ -0,0 +1,10 @@
+import benchmark
+
+
+def test_csv_round_trip(tmp_path):
+    path = str(tmp_path / "bench.csv")
+    for engines in (["walk"], ["scc", "walk"]):
+        records = benchmark.run([20], ["planted-unsat"], engines, repeats=1,
+                                warmup=0, workdir=str(tmp_path))
+        benchmark.write_csv(records, path)  # no records: just a header
+        assert benchmark.read_records(path) == records
@@ -0,0 +1,70 @@
+import itertools, os, random
+
+import pytest
+
+from solve_2sat import My2SATSolver
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def brute_force(num_vars, clauses):
+    for values in itertools.product((False, True), repeat=num_vars):
+        if all(any((literal > 0) == values[abs(literal)-1]
+                   for literal in clause) for clause in clauses):
+            return True
+    return False
+
+
+def to_cnf(num_vars, clauses):
+    return "p cnf %d %d\n" % (num_vars, len(clauses)) + "".join(
+        " ".join(map(str, clause)) + " 0\n" for clause in clauses)
+
+
+def check_certificate(steps, clauses):
+    """A cycle through some x and -x, each step given by an input clause."""
+    given = {frozenset(clause) for clause in clauses}  # (x,x) is (x,)
+    cycle = [a for a, _, _ in steps]
+    assert steps[-1][1] == cycle[0]
+    for (a, b, clause), following in zip(steps, cycle[1:] + cycle[:1]):
+        assert b == following
+        assert frozenset(clause) in given
+        assert set(clause) == ({b} if a == -b else {-a, b})
+    assert any(-x in cycle for x in cycle)
+
+
+@pytest.mark.parametrize("csr", [False, True])
+def test_certificates_against_brute_force(csr, capsys):
+    rng = random.Random(int(csr))
+    num_unsat = 0
+    for _ in range(300):
+        num_vars = rng.randint(1, 6)
+        clauses = [tuple(rng.choice((-1, 1)) * rng.randint(1, num_vars)
+                         for _ in range(rng.choice((1, 2, 2, 2, 2))))
+                   for _ in range(rng.randint(1, 4*num_vars))]
+        test_case = My2SATSolver.solve(to_cnf(num_vars, clauses), csr=csr,
+                                       certificate=True)
+        if brute_force(num_vars, clauses):
+            assert test_case.is_sat == "SAT"
+            assert test_case.certificate is None
+            continue
+        num_unsat += 1
+        assert test_case.is_sat == "UNSAT"
+        check_certificate(test_case.certificate, clauses)
+    assert num_unsat > 50  # enough UNSAT formulas were drawn
+
+
+def test_certificate_of_fixture(capsys):
+    with open(os.path.join(TEST_DIR, "2sat-2-4a.cnf")) as f:
+        text = f.read()
+    clauses = [tuple(map(int, line.split()[:-1])) 
+               for line in text.splitlines() 
+               if line and line[0] not in "cp"]
+    test_case = My2SATSolver.solve(text, certificate=True)
+    assert test_case.is_sat == "UNSAT"
+    check_certificate(test_case.certificate, clauses)
+
+
+def test_simplify_refused():
+    with pytest.raises(ValueError):
+        My2SATSolver.solve("p cnf 1 2\n1 0\n-1 0\n", simplify=True, 
+                           certificate=True)
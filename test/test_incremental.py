@@ -0,0 +1,69 @@
+import itertools, random
+
+import pytest
+
+from solve_2sat import Solver2SAT
+
+
+def brute_force(clauses):
+    variables = sorted({abs(literal) for clause in clauses 
+                        for literal in clause})
+    for values in itertools.product((0, 1), repeat=len(variables)):
+        assignments = dict(zip(variables, values))
+        if satisfies(assignments, clauses):
+            return True
+    return False
+
+
+def satisfies(assignments, clauses):
+    return all(any((literal > 0) == bool(assignments[abs(literal)])
+                   for literal in clause) for clause in clauses)
+
+
+def random_clause(rng, num_vars):
+    return tuple(rng.choice((-1, 1)) * rng.randint(1, num_vars)
+                 for _ in range(rng.choice((1, 2, 2, 2))))
+
+
+def check(session, clauses):
+    test_case = session.solve()
+    assert test_case.is_sat == ("SAT" if brute_force(clauses) else "UNSAT")
+    assert session.is_sat == (test_case.is_sat == "SAT")
+    assert test_case.num_clauses == len(clauses)
+    if test_case.is_sat == "SAT":
+        assert satisfies(test_case.assignments, clauses)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_push_pop_against_brute_force(seed):
+    rng = random.Random(seed)
+    num_vars = rng.randint(2, 7)
+    base = [random_clause(rng, num_vars) for _ in range(rng.randint(0, 4))]
+    session = Solver2SAT(base)
+    stack = [list(base)]  # clauses at each checkpoint level
+    check(session, stack[-1])
+    
+    for _ in range(60):
+        action = rng.random()
+        if action < 0.2:
+            assert session.push() == len(stack)
+            stack.append(list(stack[-1]))
+        elif action < 0.35 and len(stack) > 1:
+            assert session.pop() == len(stack)-2
+            stack.pop()
+        else:
+            clause = random_clause(rng, num_vars + 2)  # new variables too
+            session.add_clause(clause)
+            stack[-1].append(clause)
+        check(session, stack[-1])
+
+
+def test_pop_restores_satisfiable():
+    session = Solver2SAT([(1, 2)])
+    session.push()
+    session.add_clauses([(-1,), (-2,)])
+    assert not session.is_sat
+    session.pop()
+    assert session.is_sat
+    assert session.solve().assignments in ({1: 1, 2: 0}, {1: 0, 2: 1}, 
+                                           {1: 1, 2: 1})
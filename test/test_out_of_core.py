@@ -0,0 +1,70 @@
+import gzip, io, itertools, random
+
+import pytest
+
+import benchmark, solve_2sat
+from solve_2sat import My2SATSolver, flatten_clauses, verify_assignment
+
+pytestmark = pytest.mark.skipif(solve_2sat.np is None, 
+                                reason="needs NumPy")
+
+
+def brute_force(num_vars, clauses):
+    for values in itertools.product((False, True), repeat=num_vars):
+        if all(any((literal > 0) == values[abs(literal)-1]
+                   for literal in clause) for clause in clauses):
+            return True
+    return False
+
+
+def to_cnf(num_vars, clauses):
+    return ("p cnf %d %d\n" % (num_vars, len(clauses)) + "".join(
+        " ".join(map(str, clause)) + " 0\n" for clause in clauses)).encode()
+
+
+def read_clauses(path):
+    with open(path) as f:
+        return [tuple(map(int, line.split()[:-1])) for line in f 
+                if line.strip() and line[0] not in "cp"]
+
+
+def test_small_formulas_against_brute_force(tmp_path):
+    rng = random.Random(0)
+    for i in range(100):
+        num_vars = rng.randint(1, 6)
+        clauses = [tuple(rng.choice((-1, 1)) * rng.randint(1, num_vars)
+                         for _ in range(rng.choice((1, 2, 2, 2))))
+                   for _ in range(rng.randint(1, 3*num_vars))]
+        path = tmp_path / ("%d.cnf" % i)
+        path.write_bytes(to_cnf(num_vars, clauses))
+        result = My2SATSolver.solve_out_of_core(str(path), budget=1, 
+                                                directory=str(tmp_path))
+        assert result.is_sat == brute_force(num_vars, clauses)
+        if result.is_sat:
+            assert not verify_assignment(*flatten_clauses(clauses), 
+                                         result.model)
+    assert not [p for p in tmp_path.iterdir() if p.is_dir()]  # cleaned up
+
+
+@pytest.mark.parametrize("kind", ["planted-sat", "planted-unsat", "chain"])
+def test_many_runs_and_merges(tmp_path, kind):
+    # about 1 MB of text: many 64 KB runs, merged two at a time
+    path = str(tmp_path / "big.cnf")
+    benchmark.write_cnf(path, kind, 30000, 60000, seed=1)
+    expected = My2SATSolver.solve_quiet(open(path, "rb"))
+    result = My2SATSolver.solve_out_of_core(path, budget=1, 
+                                            directory=str(tmp_path))
+    assert result.is_sat == expected.is_sat
+    assert (result.num_vars, result.num_clauses, result.max_var) == \
+        (expected.num_vars, expected.num_clauses, expected.max_var)
+    if result.is_sat:
+        assert not verify_assignment(*flatten_clauses(read_clauses(path)), 
+                                     result.model)
+
+
+def test_compressed_and_in_memory_inputs(tmp_path):
+    data = to_cnf(3, [(1, 2), (-1, 3), (-3,), (-2, 1)])
+    for cnf in (io.BytesIO(data), io.BytesIO(gzip.compress(data))):
+        result = My2SATSolver.solve_out_of_core(cnf, 
+                                                directory=str(tmp_path))
+        assert not result.is_sat
@@ -0,0 +1,76 @@
+import itertools, random
+
+import pytest
+
+import solve_2sat
+from solve_2sat import My2SATSolver
+
+pytestmark = pytest.mark.skipif(solve_2sat.np is None, 
+                                reason="needs NumPy")
+
+
+def reachable(graph):
+    """Set of the nodes each node reaches, itself included."""
+    reach = [{u} for u in range(graph.num_nodes)]
+    for u in range(graph.num_nodes):
+        work = [u]
+        while work:
+            for v in graph.successors(work.pop()):
+                if v not in reach[u]:
+                    reach[u].add(v)
+                    work.append(v)
+    return reach
+
+
+def brute_force(num_vars, clauses):
+    for values in itertools.product((False, True), repeat=num_vars):
+        if all(any((literal > 0) == values[abs(literal)-1]
+                   for literal in clause) for clause in clauses):
+            return True
+    return False
+
+
+def random_clauses(rng, num_vars, num_clauses):
+    return [tuple(rng.choice((-1, 1)) * rng.randint(1, num_vars)
+                  for _ in range(rng.choice((1, 2, 2, 2))))
+            for _ in range(num_clauses)]
+
+
+@pytest.mark.parametrize("cutoff", [1, 3, 1000])
+def test_same_sccs_as_brute_force(cutoff):
+    rng = random.Random(cutoff)
+    for seed in range(25):
+        num_vars = rng.randint(1, 8)
+        clauses = random_clauses(rng, num_vars, rng.randint(0, 3*num_vars))
+        graph = My2SATSolver.create_csr_graph(clauses, num_vars)
+        sccs = My2SATSolver.tarjan_scc_parallel(graph, num_workers=2, 
+                                                threshold=0, cutoff=cutoff,
+                                                seed=seed)
+        
+        # SCCs are the classes of mutual reachability, over nodes with edges
+        reach = reachable(graph)
+        linked = {u for u in range(graph.num_nodes) 
+                  if graph.successors(u) or 
+                  any(u in graph.successors(v) 
+                      for v in range(graph.num_nodes))}
+        expected = {frozenset(v for v in reach[u] if u in reach[v]) 
+                    for u in linked}
+        assert sorted(map(sorted, sccs)) == sorted(map(sorted, expected))
+        
+        # reverse topological order: no edge into a later SCC
+        position = {u: i for i, scc in enumerate(sccs) for u in scc}
+        for u in linked:
+            for v in graph.successors(u):
+                assert position[v] <= position[u]
+        
+        model = My2SATSolver.assign_bits(graph, sccs)
+        assert (model is not None) == brute_force(num_vars, clauses)
+        if model is not None:
+            assert not solve_2sat.verify_assignment(
+                *solve_2sat.flatten_clauses(clauses), model)
+
+
+def test_small_graphs_fall_back():
+    graph = My2SATSolver.create_csr_graph([(1, 2), (-1, 2), (-2, 1)])
+    assert My2SATSolver.tarjan_scc_parallel(graph, num_workers=2) == \
+        My2SATSolver.tarjan_scc_csr(graph)
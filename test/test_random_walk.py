@@ -0,0 +1,59 @@
+import itertools, random
+
+import pytest
+
+import solve_random
+from solve_random import My2SATSolver, normalize_clauses
+
+
+def brute_force(num_vars, clauses):
+    """Whether some assignment of num_vars variables satisfies clauses."""
+    for values in itertools.product((False, True), repeat=num_vars):
+        if all(any((literal > 0) == values[abs(literal)-1]
+                   for literal in clause) for clause in clauses):
+            return True
+    return False
+
+
+def satisfies(assignments, clauses):
+    return all(any((literal > 0) == bool(assignments[abs(literal)])
+                   for literal in clause) for clause in clauses)
+
+
+WALKS = [My2SATSolver.random_walk]
+if solve_random.np is not None:
+    WALKS.append(My2SATSolver.random_walk_jit)
+
+
+def test_normalize_clauses():
+    assert normalize_clauses([(1, 1), (2, -2), (-3, -3), (1, -2), (4,)]) \
+        == [(1,), (-3,), (1, -2), (4,)]
+
+
+@pytest.mark.parametrize("walk", WALKS)
+@pytest.mark.parametrize("walksat", [False, True])
+def test_repeated_variables(walk, walksat):
+    # (x,x) and (x,-x) used to throw off the break counts of WalkSAT
+    clauses = [(-2, -1), (-2, 2), (-1, -1), (2, 1)]
+    for seed in range(20):
+        random.seed(seed)
+        result = walk([1, 2], clauses, walksat=walksat)
+        assert result["result"] == "SAT"
+        assert satisfies(result["assignments"], clauses)
+
+
+@pytest.mark.parametrize("walksat", [False, True])
+def test_small_satisfiable_formulas(walksat):
+    rng = random.Random(0)
+    for i in range(300):
+        num_vars = rng.randint(1, 4)
+        clauses = [tuple(rng.choice((-1, 1)) * rng.randint(1, num_vars)
+                         for _ in range(rng.randint(1, 2)))
+                   for _ in range(rng.randint(1, 6))]
+        if not brute_force(num_vars, clauses):
+            continue
+        random.seed(i)
+        result = My2SATSolver.random_walk(list(range(1, num_vars+1)), 
+                                          clauses, walksat=walksat)
+        assert result["result"] == "SAT", clauses
+        assert satisfies(result["assignments"], clauses)
@@ -0,0 +1,21 @@
+import os
+
+import solve_2sat, solve_random
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_bad_paths_are_errors(tmp_path):
+    garbage = tmp_path / "garbage.cnf"
+    garbage.write_bytes(b"\xff\xfe\x00 not a cnf")
+    paths = [os.path.join(TEST_DIR, "2sat-4-5.cnf"),
+             str(tmp_path / "missing.cnf"),
+             str(garbage),
+             os.path.join(TEST_DIR, "2sat-2-4a.cnf")]
+    for solver in (solve_2sat.My2SATSolver, solve_random.My2SATSolver):
+        cases = list(solver.solve_parallel(*paths, num_workers=2, timeout=30,
+                                           ordered=True))
+        assert [case.name for case in cases] == \
+            ["2sat-4-5.cnf", "missing.cnf", "garbage.cnf", "2sat-2-4a.cnf"]
+        assert [case.is_sat for case in cases[1:3]] == ["ERROR", "ERROR"]
+        assert cases[3].is_sat == "UNSAT"
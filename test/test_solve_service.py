@@ -0,0 +1,39 @@
+import asyncio, os, signal
+
+from solve_service import SolveService, read_response
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_dead_worker_is_replaced(tmp_path):
+    path = str(tmp_path / "2sat.sock")
+    with open(os.path.join(TEST_DIR, "2sat-4-5.cnf"), "rb") as f:
+        data = f.read()
+    small = b"SOLVE " + str(len(data)).encode() + b"\n" + data
+
+    async def main():
+        service = SolveService(num_workers=1)
+        server = await service.start(path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(small)
+            status, _ = await asyncio.wait_for(read_response(reader), 30)
+            assert status == "OK"
+
+            for pid in list(service.pool._processes):
+                os.kill(pid, signal.SIGKILL)
+            writer.write(small)  # answered, though perhaps as an error
+            await asyncio.wait_for(read_response(reader), 30)
+
+            for request in (small, b"NAMED missing\n"):
+                writer.write(request)
+                status, body = await asyncio.wait_for(read_response(reader),
+                                                      30)
+                assert status == ("OK" if request is small else "ERROR")
+                assert not body.startswith(b"internal error")
+            writer.close()
+        finally:
+            server.close()
+            service.close()
+
+    asyncio.run(main())
@@ -0,0 +1,19 @@
+import pytest
+
+from solve_2sat import My2SATSolver, ResultCache
+
+TEXT = "p cnf 2 2\n1 2 0\n-1 2 0\n"
+
+
+def test_stream_solves():
+    test_case = My2SATSolver.solve(TEXT, stream=True)
+    assert test_case.is_sat == "SAT"
+    assert test_case.assignments[2] == 1
+
+
+@pytest.mark.parametrize("option", [{"simplify": True},
+                                    {"memo": ResultCache()},
+                                    {"verify": True}])
+def test_stream_refuses_clause_options(option):
+    with pytest.raises(ValueError):
+        My2SATSolver.solve(TEXT, stream=True, **option)